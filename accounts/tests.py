@@ -1,7 +1,11 @@
 import pytest
+from django.core.cache import cache
 from django.test import Client
 from django.urls import reverse
 
+from accounts.forms import LoginForm, UserCreateForm
+from pomozemy import form_cache
+
 
 class TestViews:
     @pytest.mark.django_db
@@ -47,3 +51,10 @@ class TestViews:
         }
         response = client.post(reverse('register'), data)
         assert response.status_code == 200
+
+    @pytest.mark.django_db
+    def test_login_form(self, client: Client):
+        assert client.get(reverse('login')).status_code == 200
+        assert cache.get(form_cache.CachedForm(LoginForm).cache_key()) is not None
+        assert client.get(reverse('register')).status_code == 200
+        assert cache.get(form_cache.CachedForm(UserCreateForm).cache_key()) is not None
@@ -6,6 +6,7 @@ from django.views import View
 from django.views.generic import CreateView
 
 from accounts.forms import LoginForm, UserCreateForm
+from pomozemy.form_cache import CachedForm, CachedFormMixin
 
 
 class LoginView(UserPassesTestMixin, View):
@@ -13,7 +14,7 @@ class LoginView(UserPassesTestMixin, View):
         return self.request.user.is_anonymous
 
     def get(self, request):
-        return render(request, 'form.html', {'form': LoginForm()})
+        return render(request, 'form.html', {'form': CachedForm(LoginForm)})
 
     def post(self, request):
         form = LoginForm(request.POST)
@@ -34,7 +35,7 @@ class LogoutView(LoginRequiredMixin, View):
         return redirect('index')
 
 
-class UserCreate(UserPassesTestMixin, CreateView):
+class UserCreate(UserPassesTestMixin, CachedFormMixin, CreateView):
     form_class = UserCreateForm
     template_name = 'form.html'
     success_url = reverse_lazy('index')
@@ -0,0 +1,114 @@
+"""
+Requests/second of the same code base under WSGI and ASGI, measured with http_load.py.
+
+Starts gunicorn (sync workers, synchronous views) and then uvicorn (``ASYNC_VIEWS``) with the same number
+of workers and benchmark settings (benchmarks/settings.py, no DEBUG), loads each with the same clients
+and prints the two runs side by side. Fill the database with ``manage.py seed_data`` first and give paths
+that exist in it, for example::
+
+    python benchmarks/compare_servers.py /fundraiser/ /fundraiser/1/ /fundraiser/category/health/ \\
+        -c 256 -d 30 --workers 4 --output benchmarks/wsgi_vs_asgi.json
+
+Needs gunicorn and uvicorn installed. Responses other than 200 are reported, a run full of 404s or 500s
+measures nothing useful. wsgi_vs_asgi.json holds a run on one CPU against SQLite, where ASGI served 0.69x
+the requests/second of WSGI: the ORM calls of the async views still run in threads, so ASGI only adds
+overhead there. Repeat it on the production database and hardware before switching.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from http_load import run, summary
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVERS = {
+    'wsgi': ['gunicorn', 'pomozemy.wsgi:application', '--workers', '{workers}', '--bind', '127.0.0.1:{port}',
+             '--log-level', 'warning'],
+    'asgi': ['uvicorn', 'pomozemy.asgi:application', '--workers', '{workers}', '--port', '{port}',
+             '--log-level', 'warning', '--no-access-log'],
+}
+
+
+def wait_for_port(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'The server exited with {process.returncode}.')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'Nothing listens on port {port} after {timeout}s.')
+
+
+def benchmark(server, options):
+    command = [sys.executable, '-m'] + [
+        part.format(workers=options.workers, port=options.port) for part in SERVERS[server]
+    ]
+    env = dict(
+        os.environ, PYTHONPATH=str(ROOT), DJANGO_SETTINGS_MODULE='benchmarks.settings',
+        BENCHMARK_ASYNC_VIEWS='1' if server == 'asgi' else '0',
+    )
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        wait_for_port(options.port, process)
+        urls = [urlsplit(f'http://127.0.0.1:{options.port}{path}') for path in options.paths]
+        # Untimed, so both servers start with warm workers.
+        asyncio.run(run(urls, options.concurrency, options.warmup))
+        return summary(*asyncio.run(run(urls, options.concurrency, options.duration)))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=256)
+    parser.add_argument('-d', '--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--note', default='', help='Stored with the results, e.g. the database and data set.')
+    options = parser.parse_args()
+
+    results = {server: benchmark(server, options) for server in SERVERS}
+    print(f'{"":6} {"req/s":>9} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9}  statuses')
+    for server, result in results.items():
+        statuses = ', '.join(f'{status}: {count}' for status, count in result['statuses'].items())
+        print(
+            f'{server:6} {result["requests_per_s"]:9.1f} {result["p50_ms"]:9.1f} {result["p90_ms"]:9.1f} '
+            f'{result["p99_ms"]:9.1f}  {statuses}'
+        )
+        if set(result['statuses']) != {'200'}:
+            print(f'{server}: not every response was a 200, check the paths.')
+    print(f'asgi / wsgi: {results["asgi"]["requests_per_s"] / results["wsgi"]["requests_per_s"]:.2f}x req/s')
+
+    if options.output:
+        report = {
+            'environment': {
+                'paths': options.paths,
+                'concurrency': options.concurrency,
+                'duration_s': options.duration,
+                'workers': options.workers,
+                'python': platform.python_version(),
+                'cpus': os.cpu_count(),
+                'note': options.note,
+            },
+            'results': results,
+        }
+        Path(options.output).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Minimal HTTP load generator for comparing the WSGI and ASGI deployments.
+
+Start the same code base against a database filled by ``manage.py seed_data`` once under WSGI and
+once under ASGI with ``ASYNC_VIEWS = True`` in local_settings.py, for example::
+
+    gunicorn pomozemy.wsgi -w 4 -b 127.0.0.1:8001
+    uvicorn pomozemy.asgi:application --workers 4 --port 8002
+
+and run::
+
+    python benchmarks/http_load.py http://127.0.0.1:8001/fundraiser/ -c 256 -d 30
+    python benchmarks/http_load.py http://127.0.0.1:8002/fundraiser/ -c 256 -d 30
+
+Each of the ``-c`` clients keeps one connection alive and sends requests back to back for ``-d``
+seconds. Several URLs may be given, clients cycle through them. ``compare_servers.py`` starts both
+servers itself and reports the two runs side by side.
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def fetch(reader, writer, host, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by the server.')
+    length = None
+    keep_alive = status_line.startswith(b'HTTP/1.1')
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection':
+            keep_alive = value == 'keep-alive'
+    if length is None:
+        await reader.read()
+        keep_alive = False
+    else:
+        await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive
+
+
+async def client(urls, deadline, latencies, statuses):
+    connection = None
+    for url in urls:
+        if time.perf_counter() >= deadline:
+            break
+        if connection is None:
+            connection = await asyncio.open_connection(url.hostname, url.port or 80)
+        reader, writer = connection
+        path = url.path + (f'?{url.query}' if url.query else '')
+        started = time.perf_counter()
+        try:
+            status, keep_alive = await fetch(reader, writer, url.netloc, path)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            statuses['error'] = statuses.get('error', 0) + 1
+            writer.close()
+            connection = None
+            continue
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+        if not keep_alive:
+            writer.close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def run(urls, concurrency, duration):
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(itertools.islice(itertools.cycle(urls), offset, None), deadline, latencies, statuses)
+        for offset in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def summary(latencies, statuses, elapsed):
+    if len(latencies) < 2:
+        raise SystemExit(f'No successful requests: {statuses}')
+    latencies.sort()
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'requests_per_s': len(latencies) / elapsed,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'p50_ms': percentiles[49] * 1000,
+        'p90_ms': percentiles[89] * 1000,
+        'p99_ms': percentiles[98] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=64)
+    parser.add_argument('-d', '--duration', type=float, default=10)
+    options = parser.parse_args()
+
+    urls = [urlsplit(url) for url in options.urls]
+    result = summary(*asyncio.run(run(urls, options.concurrency, options.duration)))
+    print(f'requests:   {result["requests"]} in {result["elapsed_s"]:.1f}s, {result["requests_per_s"]:.1f} req/s')
+    print(f'statuses:   {", ".join(f"{status}: {count}" for status, count in result["statuses"].items())}')
+    print(
+        f'latency ms: p50 {result["p50_ms"]:.1f}, p90 {result["p90_ms"]:.1f}, '
+        f'p99 {result["p99_ms"]:.1f}, max {result["max_ms"]:.1f}'
+    )
+
+
+if __name__ == '__main__':
+    main()
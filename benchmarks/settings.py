@@ -0,0 +1,11 @@
+"""
+Settings of the servers started by compare_servers.py: the project's settings as deployed, without DEBUG,
+with the async views switched on by BENCHMARK_ASYNC_VIEWS for the ASGI run.
+"""
+import os
+
+from pomozemy.settings import *  # noqa: F401, F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+ASYNC_VIEWS = os.environ.get('BENCHMARK_ASYNC_VIEWS') == '1'
@@ -1,10 +1,24 @@
-import pytest
-from django.contrib.auth.models import User
 from datetime import datetime, timedelta
 
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils.timezone import make_aware
 
-from fundraisers.models import Fundraiser, Category
+from fundraisers.models import Category, Fundraiser
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    # A view that starts running more queries fails its tests instead of only logging a warning.
+    settings.QUERY_BUDGET_ACTION = 'raise'
 
 
 @pytest.fixture
@@ -8,7 +8,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 class FundraiserAdmin(admin.ModelAdmin):
-    readonly_fields = ('slug',)
+    readonly_fields = ('slug',) + Fundraiser.counter_fields
 
 
 admin.site.register(Category, CategoryAdmin)
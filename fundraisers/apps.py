@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class FundraiserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fundraisers'
+
+    def ready(self):
+        import fundraisers.signals  # noqa: F401
+        from fundraisers.search_index import restore_after_migrate
+
+        post_migrate.connect(restore_after_migrate, sender=self)
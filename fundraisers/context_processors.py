@@ -1,7 +1,34 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
 from fundraisers.models import Category
 
+NAV_CATEGORIES_CACHE_KEY = 'fundraisers:nav_categories'
+# Live counts depend on start/end dates too, so entries also expire on their own.
+NAV_CATEGORIES_CACHE_TIMEOUT = 300
+
+
+def nav_categories():
+    categories = cache.get(NAV_CATEGORIES_CACHE_KEY)
+    if categories is None:
+        now = timezone.now()
+        live = Q(fundraiser__active=True, fundraiser__start_date__lte=now, fundraiser__end_date__gte=now)
+        categories = list(
+            Category.objects.order_by('pk').annotate(
+                live_count=Count('fundraiser', filter=live),
+            ).values('slug', 'name', 'live_count')
+        )
+        cache.set(NAV_CATEGORIES_CACHE_KEY, categories, NAV_CATEGORIES_CACHE_TIMEOUT)
+    return categories
+
+
+def invalidate_nav_categories():
+    cache.delete(NAV_CATEGORIES_CACHE_KEY)
+
 
 def fundraisers_context(request):
     return {
-        'categories': Category.objects.all(),
+        'categories': SimpleLazyObject(nav_categories),
     }
@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+FRAGMENT_TEMPLATES = {
+    'card': 'fundraiser/fragments/card.html',
+    'detail_header': 'fundraiser/fragments/detail_header.html',
+    'detail_description': 'fundraiser/fragments/detail_description.html',
+}
+# Keys change with every revision, the timeout only bounds how long superseded fragments linger.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def fragment_key(name, fundraiser):
+    return f'fundraisers:fragment:{name}:{fundraiser.pk}:{fundraiser.revision}:{get_language()}'
+
+
+def render_fragment(name, fundraiser):
+    return render_to_string(FRAGMENT_TEMPLATES[name], {'object': fundraiser})
+
+
+def render_fragments(fragments):
+    keys = [fragment_key(name, fundraiser) for name, fundraiser in fragments]
+    rendered = cache.get_many(keys)
+    missing = {
+        key: render_fragment(name, fundraiser)
+        for key, (name, fundraiser) in zip(keys, fragments) if key not in rendered
+    }
+    if missing:
+        cache.set_many(missing, FRAGMENT_CACHE_TIMEOUT)
+        rendered.update(missing)
+    return [mark_safe(rendered[key]) for key in keys]
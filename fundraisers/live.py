@@ -0,0 +1,173 @@
+"""
+Live progress of fundraisers pushed to the detail page as Server-Sent Events.
+
+Every worker has one Broadcaster. It asks its backend for changes of all watched fundraisers at once
+and fans them out to the connected clients, so the number of watchers does not multiply the
+database load.
+"""
+import asyncio
+import functools
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Q
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+from fundraisers.models import Fundraiser, Transaction
+from pomozemy.asynchronous import database_sync_to_async
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = {
+    'collected': 'collected',
+    'transactions': 'transaction_count',
+    'votes_positive': 'votes_positive',
+    'votes_negative': 'votes_negative',
+}
+HEARTBEAT_INTERVAL = 15
+QUEUE_SIZE = 100
+
+
+class DatabaseBackend:
+    """Polls the watched fundraisers, a changed revision means new totals, votes or donations."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.revisions = {}
+        self.last_transactions = {}
+
+    async def changes(self, fundraiser_ids):
+        await asyncio.sleep(self.interval)
+        return await database_sync_to_async(self.poll)(fundraiser_ids)
+
+    def poll(self, fundraiser_ids):
+        events = []
+        revisions = {}
+        changed = []
+        rows = Fundraiser.objects.filter(pk__in=fundraiser_ids).values_list(
+            'pk', 'revision', *PROGRESS_FIELDS.values(),
+        )
+        for pk, revision, *progress in rows:
+            revisions[pk] = revision
+            if self.revisions.get(pk) != revision:
+                events.append((pk, 'progress', dict(zip(PROGRESS_FIELDS, progress))))
+                if pk in self.revisions:
+                    changed.append(pk)
+
+        if changed:
+            condition = Q()
+            for pk in changed:
+                condition |= Q(fundraiser_id=pk, pk__gt=self.last_transactions.get(pk, 0))
+            for transaction in Transaction.objects.filter(condition).select_related('user').order_by('pk'):
+                events.append((transaction.fundraiser_id, 'donation', {
+                    'id': transaction.pk,
+                    'html': render_to_string('fundraiser/transaction_list.html', {'transactions': [transaction]}),
+                }))
+                self.last_transactions[transaction.fundraiser_id] = transaction.pk
+
+        new = [pk for pk in revisions if pk not in self.revisions]
+        if new:
+            self.last_transactions.update(
+                Transaction.objects.filter(fundraiser_id__in=new).order_by().values('fundraiser_id').annotate(
+                    last=Max('pk'),
+                ).values_list('fundraiser_id', 'last')
+            )
+        self.revisions = revisions
+        self.last_transactions = {pk: last for pk, last in self.last_transactions.items() if pk in revisions}
+        return events
+
+
+class Broadcaster:
+    def __init__(self, backend):
+        self.backend = backend
+        self.subscribers = {}
+        self.latest = {}
+        self.task = None
+
+    def subscribe(self, fundraiser_id):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.setdefault(fundraiser_id, set()).add(queue)
+        if fundraiser_id in self.latest:
+            queue.put_nowait(('progress', self.latest[fundraiser_id]))
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return queue
+
+    def unsubscribe(self, fundraiser_id, queue):
+        queues = self.subscribers.get(fundraiser_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(fundraiser_id, None)
+            self.latest.pop(fundraiser_id, None)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                events = await self.backend.changes(list(self.subscribers))
+            except Exception:
+                logger.exception('Checking fundraisers for live updates failed.')
+                await asyncio.sleep(self.backend.interval)
+                continue
+            for fundraiser_id, event, data in events:
+                if fundraiser_id not in self.subscribers:
+                    continue
+                if event == 'progress':
+                    self.latest[fundraiser_id] = data
+                for queue in self.subscribers[fundraiser_id]:
+                    try:
+                        queue.put_nowait((event, data))
+                    except asyncio.QueueFull:
+                        # A client that cannot keep up misses events rather than holding up the others.
+                        pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_broadcaster():
+    backend = import_string(settings.LIVE_UPDATES_BACKEND)
+    return Broadcaster(backend(settings.LIVE_UPDATES_INTERVAL))
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))}\n\n'.encode()
+
+
+async def live_application(scope, receive, send, fundraiser_id):
+    """ASGI application streaming the events of one fundraiser, routed in pomozemy/asgi.py."""
+    if not await database_sync_to_async(Fundraiser.objects.filter(pk=fundraiser_id).exists)():
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not found.'})
+        return
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    broadcaster = get_broadcaster()
+    queue = broadcaster.subscribe(fundraiser_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        while True:
+            event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {event, disconnected}, timeout=HEARTBEAT_INTERVAL, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if event not in done:
+                event.cancel()
+            if disconnected in done:
+                break
+            body = format_event(*event.result()) if event in done else b': keep-alive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        disconnected.cancel()
+        broadcaster.unsubscribe(fundraiser_id, queue)
@@ -0,0 +1,245 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from datetime import timedelta
+from importlib import import_module
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from fundraisers.models import Comment, Fundraiser, Transaction
+from fundraisers.pagination import encode_cursor, feed_page
+from static_pages.models import StaticPage
+
+# Every named URL of these modules must have at least one case.
+URL_MODULES = ('fundraisers.urls', 'static_pages.urls', 'accounts.urls')
+BENCHMARK_USERNAME = 'benchmark-login'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# `writes` requests run in a transaction that is rolled back, `setup` runs in it before the timed request.
+Case = namedtuple('Case', 'url_name label method path data user writes setup', defaults=(None, None, False, None))
+
+
+def create_login_user():
+    User.objects.create_user(BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD)
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests every URL of the fundraisers, static_pages and accounts apps through the full middleware '
+        'stack and reports latency percentiles and query counts. Run it against a database filled by '
+        'seed_data; requests that write are rolled back. --output writes JSON that --compare reads, to '
+        'compare runs between commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per case.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per case, to fill caches.')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('At least one iteration is needed.')
+        cases = list(self.cases())
+        missing = self.url_names() - {case.url_name for case in cases}
+        if missing:
+            raise CommandError(f'No benchmark for: {", ".join(sorted(missing))}.')
+
+        results = {}
+        for case in cases:
+            # Repeated writes would be throttled after the first few.
+            with override_settings(THROTTLE_RATES={}):
+                results[case.label] = result = self.run_case(case, options)
+            self.stdout.write(
+                f'{case.label}: {result["status"]}, {result["queries"]} queries, '
+                f'p50 {result["p50_ms"]:.1f} ms, p90 {result["p90_ms"]:.1f} ms, p99 {result["p99_ms"]:.1f} ms'
+            )
+        failed = [label for label, result in results.items() if result['status'] >= 500]
+
+        report = {'environment': self.environment(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.compare(json.load(previous)['results'], results)
+        if failed:
+            raise CommandError(f'Server errors: {", ".join(failed)}.')
+
+    @staticmethod
+    def url_names():
+        return {
+            pattern.name for module in URL_MODULES for pattern in import_module(module).urlpatterns if pattern.name
+        }
+
+    def cases(self):
+        fundraisers = Fundraiser.objects.live().select_related('category', 'owner')
+        fundraiser = fundraisers.order_by('-transaction_count').first()
+        if fundraiser is None:
+            raise CommandError('The database has no live fundraisers, run seed_data first.')
+        static_page = StaticPage.objects.only('slug').order_by('pk').first()
+        if static_page is None:
+            raise CommandError('The database has no static pages, run seed_data first.')
+        owner = fundraiser.owner
+        pk = fundraiser.pk
+        # The second pages, the first ones are part of the detail page.
+        transaction_cursor = feed_page(fundraiser.transaction_set.all()).next_cursor or ''
+        comment_cursor = feed_page(fundraiser.comment_set.all()).next_cursor or ''
+        list_cursor = encode_cursor('next', [pk])
+        now = timezone.localtime()
+        fundraiser_form = {
+            'name': 'Benchmark', 'category': fundraiser.category_id, 'active': 'on', 'purpose': 1000,
+            'start_date': now.strftime('%Y-%m-%dT%H:%M:%S'),
+            'end_date': (now + timedelta(days=30)).strftime('%Y-%m-%dT%H:%M:%S'),
+            'description': '<p>Benchmark</p>',
+        }
+
+        yield Case('fundraiser_list', 'fundraiser_list', 'get', reverse('fundraiser_list'))
+        yield Case('fundraiser_list', 'fundraiser_list next page', 'get', reverse('fundraiser_list'), {
+            'cursor': list_cursor,
+        })
+        for sort in ('trending', 'nearly_funded'):
+            yield Case('fundraiser_list', f'fundraiser_list {sort}', 'get', reverse('fundraiser_list'), {'sort': sort})
+        yield Case('fundraiser_my_list', 'fundraiser_my_list', 'get', reverse('fundraiser_my_list'), user=owner)
+        yield Case('fundraiser_search', 'fundraiser_search', 'get', reverse('fundraiser_search'), {
+            'q': fundraiser.name.split()[0],
+        })
+        yield Case(
+            'fundraiser_category_list', 'fundraiser_category_list', 'get',
+            reverse('fundraiser_category_list', args=[fundraiser.category.slug]),
+        )
+        yield Case('fundraiser_detail', 'fundraiser_detail', 'get', reverse('fundraiser_detail', args=[pk]))
+        yield Case('fundraiser_detail', 'fundraiser_detail owner', 'get', reverse('fundraiser_detail', args=[pk]),
+                   user=owner)
+        yield Case('fundraiser_create', 'fundraiser_create', 'get', reverse('fundraiser_create'), user=owner)
+        yield Case('fundraiser_create', 'fundraiser_create post', 'post', reverse('fundraiser_create'),
+                   fundraiser_form, owner, writes=True)
+        yield Case('fundraiser_update', 'fundraiser_update', 'get', reverse('fundraiser_update', args=[pk]), user=owner)
+        yield Case('fundraiser_update', 'fundraiser_update post', 'post', reverse('fundraiser_update', args=[pk]),
+                   dict(fundraiser_form, name=fundraiser.name), owner, writes=True)
+        yield Case('fundraiser_transaction_export', 'fundraiser_transaction_export', 'get',
+                   reverse('fundraiser_transaction_export', args=[pk]), user=owner)
+        yield Case('fundraiser_comment_add', 'fundraiser_comment_add', 'post',
+                   reverse('fundraiser_comment_add', args=[pk]), {'message': 'Benchmark'}, owner, writes=True)
+        yield Case('fundraiser_comment_list', 'fundraiser_comment_list', 'get',
+                   reverse('fundraiser_comment_list', args=[pk]), {'cursor': comment_cursor})
+        yield Case('fundraiser_live', 'fundraiser_live', 'get', reverse('fundraiser_live', args=[pk]))
+        yield Case('fundraiser_vote', 'fundraiser_vote', 'post', reverse('fundraiser_vote', args=[pk]),
+                   {'vote': 'up'}, owner, writes=True)
+        yield Case('fundraiser_transaction_add', 'fundraiser_transaction_add', 'post',
+                   reverse('fundraiser_transaction_add', args=[pk]), {'amount': '10', 'comment': ''}, owner,
+                   writes=True)
+        yield Case('fundraiser_transaction_list', 'fundraiser_transaction_list', 'get',
+                   reverse('fundraiser_transaction_list', args=[pk]), {'cursor': transaction_cursor})
+        yield Case('api_fundraiser_list', 'api_fundraiser_list', 'get', reverse('api_fundraiser_list'))
+        yield Case('api_fundraiser_bulk', 'api_fundraiser_bulk', 'get', reverse('api_fundraiser_bulk'), {
+            'ids': ','.join(str(pk) for pk in Fundraiser.objects.live().order_by('-pk').values_list('pk', flat=True)[
+                :50
+            ]),
+        })
+        yield Case('api_fundraiser_detail', 'api_fundraiser_detail', 'get', reverse('api_fundraiser_detail', args=[pk]))
+        yield Case('api_fundraiser_progress', 'api_fundraiser_progress', 'get',
+                   reverse('api_fundraiser_progress', args=[pk]))
+        yield Case('api_fundraiser_history', 'api_fundraiser_history', 'get',
+                   reverse('api_fundraiser_history', args=[pk]))
+        yield Case('api_category_list', 'api_category_list', 'get', reverse('api_category_list'))
+        yield Case('static_page', 'static_page', 'get', reverse('static_page', args=[static_page.slug]))
+        yield Case('login', 'login', 'get', reverse('login'))
+        yield Case('login', 'login post', 'post', reverse('login'), {
+            'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD,
+        }, writes=True, setup=create_login_user)
+        yield Case('logout', 'logout', 'get', reverse('logout'), user=owner, writes=True)
+        yield Case('register', 'register', 'get', reverse('register'))
+        yield Case('register', 'register post', 'post', reverse('register'), {
+            'email': 'benchmark@example.com', 'first_name': 'Bench', 'last_name': 'Mark', 'password': 'benchmark',
+        }, writes=True)
+
+    def run_case(self, case, options):
+        client = Client(HTTP_HOST=options['host'])
+        for _ in range(options['warmup']):
+            self.request(client, case)
+        # Counted on a warm request of its own, capturing queries would add to the timings.
+        status, elapsed, queries = self.request(client, case, count_queries=True)
+        latencies = sorted(self.request(client, case)[1] for _ in range(options['iterations']))
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else (
+            latencies * 99
+        )
+        return {
+            'url_name': case.url_name,
+            'method': case.method.upper(),
+            'path': case.path,
+            'status': status,
+            'queries': queries,
+            'p50_ms': percentiles[49] * 1000,
+            'p90_ms': percentiles[89] * 1000,
+            'p99_ms': percentiles[98] * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
+
+    def request(self, client, case, count_queries=False):
+        if case.user is not None:
+            client.force_login(case.user)
+        if not case.writes:
+            return self.timed_request(client, case, count_queries)
+        with transaction.atomic():
+            if case.setup:
+                case.setup()
+            result = self.timed_request(client, case, count_queries)
+            transaction.set_rollback(True)
+        return result
+
+    @staticmethod
+    def timed_request(client, case, count_queries):
+        with CaptureQueriesContext(connection) if count_queries else nullcontext() as context:
+            started = time.perf_counter()
+            response = getattr(client, case.method)(case.path, case.data or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(context.captured_queries) if count_queries else None
+
+    def environment(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'rows': {
+                model._meta.label: model.objects.count()
+                for model in (User, Fundraiser, Transaction, Comment, StaticPage)
+            },
+        }
+
+    def compare(self, previous, results):
+        self.stdout.write('\nChange against the earlier run:')
+        for label, result in results.items():
+            before = previous.get(label)
+            if before is None:
+                self.stdout.write(f'{label}: new')
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            self.stdout.write(
+                f'{label}: p50 {before["p50_ms"]:.1f} -> {result["p50_ms"]:.1f} ms ({change:+.0f}%), '
+                f'queries {before["queries"]} -> {result["queries"]}'
+            )
@@ -0,0 +1,102 @@
+import re
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from fundraisers.models import Fundraiser, Transaction, Comment, Vote
+from fundraisers.pagination import encode_cursor
+from static_pages.models import StaticPage
+
+SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'^SCAN (\w+)$', re.MULTILINE),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs EXPLAIN on every query issued by the listing and detail views and fails if any of them '
+        'falls back to a sequential scan of a large table. Run it against a seeded database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append', dest='tables',
+            help='Table that must never be scanned sequentially, may be given multiple times.',
+        )
+
+    def handle(self, *args, **options):
+        pattern = SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Query plans cannot be checked on {connection.vendor}.')
+        tables = set(options['tables'] or [
+            model._meta.db_table for model in (Fundraiser, Transaction, Comment, Vote, StaticPage)
+        ])
+        known_tables = set(connection.introspection.table_names())
+
+        # Navigation menus are cached, fill the cache first so only the views' own queries are checked.
+        self.capture_queries(reverse('index'), None)
+        offending = []
+        for name, path, user in self.requests():
+            for sql in self.capture_queries(path, user):
+                plan = self.explain(sql)
+                scanned = [
+                    table for table in pattern.findall('\n'.join(plan))
+                    if table in tables or table not in known_tables
+                ]
+                self.stdout.write(f'{name}: {"SEQ SCAN " + ", ".join(scanned) if scanned else "ok"}')
+                if scanned:
+                    offending.append((name, sql, plan))
+
+        for name, sql, plan in offending:
+            self.stderr.write(f'{name}\n{sql}\n' + '\n'.join(plan) + '\n')
+        if offending:
+            raise CommandError(f'{len(offending)} queries fall back to a sequential scan.')
+
+    def requests(self):
+        fundraiser = Fundraiser.objects.filter(active=True).order_by('-transaction_count').first()
+        if fundraiser is None:
+            raise CommandError('The database has no active fundraisers, seed it first.')
+        cursor = encode_cursor('next', [fundraiser.pk])
+        yield 'fundraiser_list', reverse('fundraiser_list'), None
+        yield 'fundraiser_list (next page)', f'{reverse("fundraiser_list")}?cursor={cursor}', None
+        for sort, key in (('trending', fundraiser.trending), ('nearly_funded', fundraiser.funded_ratio)):
+            yield f'fundraiser_list ({sort})', f'{reverse("fundraiser_list")}?sort={sort}', None
+            yield f'fundraiser_list ({sort}, next page)', f'{reverse("fundraiser_list")}?' + urlencode(
+                {'sort': sort, 'cursor': encode_cursor('next', [key, fundraiser.pk])}
+            ), None
+        yield 'fundraiser_category_list', reverse('fundraiser_category_list', args=[fundraiser.category.slug]), None
+        yield 'fundraiser_my_list', reverse('fundraiser_my_list'), fundraiser.owner
+        yield 'fundraiser_detail', reverse('fundraiser_detail', args=[fundraiser.pk]), None
+        yield 'fundraiser_transaction_list', reverse(
+            'fundraiser_transaction_list', args=[fundraiser.pk]
+        ) + f'?cursor={cursor}', None
+        yield 'fundraiser_comment_list', reverse(
+            'fundraiser_comment_list', args=[fundraiser.pk]
+        ) + f'?cursor={cursor}', None
+        static_page = StaticPage.objects.only('slug').first()
+        if static_page:
+            yield 'static_page', reverse('static_page', args=[static_page.slug]), None
+
+    def capture_queries(self, path, user):
+        request = RequestFactory().get(path)
+        request.user = user or AnonymousUser()
+        match = resolve(request.path_info)
+        with CaptureQueriesContext(connection) as context:
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        if response.status_code != 200:
+            raise CommandError(f'{path} answered with {response.status_code}.')
+        return [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            rows = cursor.fetchall()
+        return [str(row[-1]) for row in rows]
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from fundraisers import votes
+from fundraisers.models import Fundraiser
+
+
+class Command(BaseCommand):
+    help = 'Writes the votes buffered in the cache to the fundraisers, see the VOTE_BUFFERING setting.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep running and flush every given number of seconds, the most votes a crash can lose.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deltas = votes.take()
+            Fundraiser.add_votes_many(deltas)
+            if options['verbosity'] > 1 or not options['interval']:
+                self.stdout.write(f'Flushed votes of {len(deltas)} fundraisers.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
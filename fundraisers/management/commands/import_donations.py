@@ -0,0 +1,133 @@
+import csv
+import json
+import time
+from contextlib import ExitStack
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from fundraisers.models import DonationRollup, Fundraiser, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports offline donations from a CSV or JSONL file with fundraiser, amount and optional comment '
+        'columns. The file is streamed and written in chunks, one database transaction per chunk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--rejects', help='Write rejected rows with the reason to this CSV file.')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Unknown file format, pass --format.')
+        self.amount_field = Transaction._meta.get_field('amount')
+        self.comment_field = Transaction._meta.get_field('comment')
+
+        started = time.monotonic()
+        imported = rejected = 0
+        with ExitStack() as stack:
+            file = stack.enter_context(open(options['path'], newline='', encoding='utf-8'))
+            rejects = None
+            if options['rejects']:
+                rejects = csv.writer(stack.enter_context(open(options['rejects'], 'w', newline='', encoding='utf-8')))
+                rejects.writerow(['line', 'error', 'row'])
+
+            rows = self.read_csv(file) if file_format == 'csv' else self.read_jsonl(file)
+            for chunk in self.chunks(rows, options['chunk_size']):
+                created, errors = self.import_chunk(chunk)
+                imported += created
+                rejected += len(errors)
+                for line, row, error in errors:
+                    if rejects:
+                        rejects.writerow([line, error, json.dumps(row, default=str)])
+                    else:
+                        self.stderr.write(f'Line {line}: {error}')
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{imported} imported, {rejected} rejected')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Imported {imported} donations, rejected {rejected} rows in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/s).'
+        )
+
+    def read_csv(self, file):
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            yield line, row
+
+    def read_jsonl(self, file):
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = {'raw': text.rstrip('\n')}
+            yield line, row
+
+    @staticmethod
+    def chunks(rows, size):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def clean_row(self, row):
+        if not isinstance(row, dict) or 'raw' in row:
+            raise ValidationError('Malformed row.')
+        try:
+            fundraiser_id = int(row.get('fundraiser'))
+        except (TypeError, ValueError):
+            raise ValidationError('Invalid fundraiser id.')
+        amount = self.amount_field.clean(row.get('amount'), None)
+        if amount <= 0:
+            raise ValidationError('Amount must be positive.')
+        comment = self.comment_field.clean(row.get('comment') or '', None)
+        return Transaction(fundraiser_id=fundraiser_id, amount=amount, comment=comment)
+
+    def import_chunk(self, chunk):
+        transactions = []
+        errors = []
+        for line, row in chunk:
+            try:
+                transactions.append((line, row, self.clean_row(row)))
+            except ValidationError as error:
+                errors.append((line, row, ' '.join(error.messages)))
+
+        existing = set(Fundraiser.objects.filter(
+            pk__in={item.fundraiser_id for _, _, item in transactions},
+        ).values_list('pk', flat=True))
+        valid = []
+        for line, row, item in transactions:
+            if item.fundraiser_id in existing:
+                valid.append(item)
+            else:
+                errors.append((line, row, 'Fundraiser does not exist.'))
+
+        totals = {}
+        for item in valid:
+            amount, count = totals.get(item.fundraiser_id, (Decimal(0), 0))
+            totals[item.fundraiser_id] = (amount + item.amount, count + 1)
+        with transaction.atomic():
+            Transaction.objects.bulk_create(valid, batch_size=1000)
+            Fundraiser.add_to_totals_many(totals)
+            days = {}
+            for item in valid:
+                key = (item.fundraiser_id, timezone.localdate(item.created_at))
+                amount, count = days.get(key, (Decimal(0), 0))
+                days[key] = (amount + item.amount, count + 1)
+            DonationRollup.add_many(days)
+        return len(valid), sorted(errors, key=lambda error: error[0])
+
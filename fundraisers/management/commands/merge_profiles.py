@@ -0,0 +1,56 @@
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Merges the collapsed stacks written by the sampling profiler (see pomozemy/profiling.py) and ranks '
+        'the functions by their own samples, with the share of samples they appear in. --output writes the '
+        'merged stacks for flamegraph.pl or speedscope.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', nargs='?', help='Defaults to PROFILING_DIR.')
+        parser.add_argument(
+            '--url-name', action='append', dest='url_names',
+            help='Only merge the profiles of this URL name, may be given multiple times.',
+        )
+        parser.add_argument('--limit', type=int, default=30, help='Number of functions listed.')
+        parser.add_argument('--output', help='Write the merged collapsed stacks to this file.')
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or settings.PROFILING_DIR
+        if not directory or not Path(directory).is_dir():
+            raise CommandError('Give the directory with the profiles or set PROFILING_DIR.')
+        paths = sorted(
+            path for path in Path(directory).glob('*/*.collapsed')
+            if not options['url_names'] or path.parent.name in options['url_names']
+        )
+        if not paths:
+            raise CommandError(f'No profiles in {directory}.')
+
+        stacks = Counter()
+        for path in paths:
+            for line in path.read_text().splitlines():
+                stack, _, count = line.rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+        own = Counter()
+        total = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            # Recursive functions count once per stack.
+            for frame in set(frames):
+                total[frame] += count
+        samples = sum(stacks.values())
+
+        self.stdout.write(f'Merged {len(paths)} profiles, {samples} samples.')
+        self.stdout.write(f'{"own %":>7} {"total %":>7}  function')
+        for frame, count in own.most_common(options['limit']):
+            self.stdout.write(f'{count / samples * 100:7.1f} {total[frame] / samples * 100:7.1f}  {frame}')
+        if options['output']:
+            Path(options['output']).write_text(''.join(f'{stack} {count}\n' for stack, count in stacks.most_common()))
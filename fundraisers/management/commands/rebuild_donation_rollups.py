@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+
+from fundraisers.models import DonationRollup, Fundraiser, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the daily donation rollups from the transactions. Fundraisers are split into ranges of '
+        'primary keys that are rebuilt in parallel, one database transaction per range.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Fundraisers per range.')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        bounds = Fundraiser.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write('There are no fundraisers.')
+            return
+        chunk_size = options['chunk_size']
+        chunks = [
+            (start, start + chunk_size - 1) for start in range(bounds['first'], bounds['last'] + 1, chunk_size)
+        ]
+        # SQLite has a single writer, parallel chunks would only wait for each other's locks.
+        if options['workers'] > 1 and connection.vendor != 'sqlite':
+            with ThreadPoolExecutor(options['workers']) as executor:
+                rollups = sum(executor.map(self.rebuild_in_thread, chunks))
+        else:
+            rollups = sum(map(self.rebuild, chunks))
+        self.stdout.write(f'Rebuilt {rollups} daily rollups in {len(chunks)} chunks.')
+
+    def rebuild_in_thread(self, chunk):
+        try:
+            return self.rebuild(chunk)
+        finally:
+            connection.close()
+
+    def rebuild(self, chunk):
+        in_chunk = {'fundraiser_id__gte': chunk[0], 'fundraiser_id__lte': chunk[1]}
+        with transaction.atomic():
+            # Donations to locked fundraisers wait until the range is rebuilt, then add to the new rollups.
+            list(Fundraiser.objects.select_for_update().filter(pk__range=chunk).values_list('pk', flat=True))
+            DonationRollup.objects.filter(**in_chunk).delete()
+            days = Transaction.objects.filter(**in_chunk).order_by().values(
+                'fundraiser_id', day=TruncDate('created_at'),
+            ).annotate(amount=Sum('amount'), count=Count('pk'))
+            rollups = DonationRollup.objects.bulk_create((DonationRollup(**row) for row in days), batch_size=1000)
+        if self.verbosity > 1:
+            self.stdout.write(f'Fundraisers {chunk[0]}-{chunk[1]}: {len(rollups)} rollups')
+        return len(rollups)
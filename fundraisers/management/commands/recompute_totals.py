@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from fundraisers.models import Fundraiser, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored collected amount and donation count of every fundraiser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report fundraisers whose stored totals differ, exit with an error if any do.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        checked = 0
+        mismatched = 0
+        while True:
+            with transaction.atomic():
+                chunk = Fundraiser.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'purpose', *Fundraiser.counter_fields
+                )[:chunk_size]
+                if not options['check']:
+                    chunk = chunk.select_for_update()
+                fundraisers = list(chunk)
+                if not fundraisers:
+                    break
+                last_pk = fundraisers[-1].pk
+                totals = {
+                    row['fundraiser_id']: row for row in Transaction.objects.filter(
+                        fundraiser_id__in=[fundraiser.pk for fundraiser in fundraisers],
+                    ).order_by().values('fundraiser_id').annotate(amount=Sum('amount'), count=Count('pk'))
+                }
+                stale = []
+                for fundraiser in fundraisers:
+                    row = totals.get(fundraiser.pk, {'amount': Decimal(0), 'count': 0})
+                    if fundraiser.collected != row['amount'] or fundraiser.transaction_count != row['count']:
+                        self.stdout.write(
+                            f'{fundraiser.pk}: stored {fundraiser.collected}/{fundraiser.transaction_count}, '
+                            f'actual {row["amount"]}/{row["count"]}'
+                        )
+                        fundraiser.collected = row['amount']
+                        fundraiser.transaction_count = row['count']
+                        fundraiser.funded_ratio = (
+                            float(row['amount']) / fundraiser.purpose if fundraiser.purpose else 0.0
+                        )
+                        # The rows are locked, a new revision drops the cached fragments showing the old totals.
+                        fundraiser.revision += 1
+                        stale.append(fundraiser)
+                if stale and not options['check']:
+                    Fundraiser.objects.bulk_update(stale, Fundraiser.counter_fields)
+                checked += len(fundraisers)
+                mismatched += len(stale)
+
+        self.stdout.write(f'Checked {checked} fundraisers, {mismatched} with stale totals.')
+        if options['check'] and mismatched:
+            raise CommandError(f'{mismatched} fundraisers have stale totals.')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from fundraisers import trending
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the trending scores the fundraiser list can be sorted by.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep running and refresh every given number of seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            updated = trending.refresh(options['batch_size'])
+            if options['verbosity'] > 1 or not options['interval']:
+                self.stdout.write(f'Updated the trending score of {updated} fundraisers.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,198 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from fundraisers import trending
+from fundraisers.context_processors import invalidate_nav_categories
+from fundraisers.models import Category, Comment, Fundraiser, Transaction
+from pomozemy.sanitizer import render_html
+from static_pages.models import StaticPage
+
+WORDS = (
+    'pomoc leczenie rehabilitacja schronisko karma szkoła dzieci wózek operacja remont dom pożar powódź '
+    'sprzęt zwierzęta koty psy biblioteka książki muzyka sport drużyna wyjazd obóz stypendium studia '
+    'terapia lekarstwa transport samochód dach ogród sąsiedzi wolontariusze fundacja zbiórka cel'
+).split()
+FIRST_NAMES = ('Anna', 'Piotr', 'Katarzyna', 'Tomasz', 'Magdalena', 'Paweł', 'Agnieszka', 'Michał', 'Ewa', 'Jan')
+LAST_NAMES = ('Nowak', 'Kowalski', 'Wiśniewska', 'Wójcik', 'Kamińska', 'Lewandowski', 'Zielińska', 'Szymański')
+# Password of every seeded user, so any of them can log in.
+PASSWORD = 'seed'
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills the database with generated users, categories, fundraisers, donations, comments and static '
+        'pages for benchmarks. Donations and comments follow a long-tailed distribution over fundraisers, '
+        'stored totals and rollups are kept consistent. Example: --fundraisers 100000 --transactions 10000000'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--fundraisers', type=int, default=10000)
+        parser.add_argument('--transactions', type=int, default=200000, help='Approximate number of donations.')
+        parser.add_argument('--comments', type=int, default=50000, help='Approximate number of comments.')
+        parser.add_argument('--static-pages', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=1000, help='Fundraisers generated per transaction.')
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible data.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.verbosity = options['verbosity']
+        if options['users'] < 1 or options['categories'] < 1:
+            raise CommandError('At least one user and one category are needed.')
+
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            categories = self.create_categories(options['categories'])
+            self.create_static_pages(options['static_pages'])
+
+        per_fundraiser = {
+            'transactions': options['transactions'] / max(options['fundraisers'], 1),
+            'comments': options['comments'] / max(options['fundraisers'], 1),
+        }
+        created = {'fundraisers': 0, 'transactions': 0, 'comments': 0}
+        for start in range(0, options['fundraisers'], options['batch_size']):
+            count = min(options['batch_size'], options['fundraisers'] - start)
+            with transaction.atomic():
+                batch = self.create_fundraisers(count, users, categories, per_fundraiser)
+            for key, value in batch.items():
+                created[key] += value
+            if self.verbosity > 1:
+                self.stdout.write(f'{start + count} fundraisers, {created["transactions"]} donations')
+
+        call_command('rebuild_donation_rollups', verbosity=0)
+        trending.refresh()
+        # bulk_create sends no signals.
+        invalidate_nav_categories()
+        self.stdout.write(
+            f'Created {len(users)} users, {len(categories)} categories, {created["fundraisers"]} fundraisers, '
+            f'{created["transactions"]} donations, {created["comments"]} comments, '
+            f'{options["static_pages"]} static pages.'
+        )
+
+    def next_number(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def paragraphs(self, count):
+        return ''.join(f'<p>{self.words(self.random.randint(15, 60))}</p>' for _ in range(count))
+
+    def long_tail(self, mean):
+        # Pareto with alpha 2 has a mean of 2: most fundraisers get few rows, a few get very many.
+        return round(mean * self.random.paretovariate(2) / 2)
+
+    def moment(self, start, end):
+        return start + (end - start) * self.random.random()
+
+    @staticmethod
+    def bulk_create_dated(model, objects, batch_size=None):
+        """bulk_create keeping the generated created_at and updated_at, which it sets to the current time."""
+        timestamps = [(obj.created_at, obj.updated_at) for obj in objects]
+        model.objects.bulk_create(objects, batch_size=batch_size)
+        for obj, (created_at, updated_at) in zip(objects, timestamps):
+            obj.created_at, obj.updated_at = created_at, updated_at
+        # Unlike save(), bulk_update writes auto_now fields as they are. Its statements have a CASE branch per
+        # object, so its batches are kept small.
+        model.objects.bulk_update(objects, ['created_at', 'updated_at'], batch_size=500)
+
+    def create_users(self, count):
+        first = self.next_number(User)
+        password = make_password(PASSWORD)
+        return User.objects.bulk_create((
+            User(
+                username=f'seed{first + i}',
+                email=f'seed{first + i}@example.com',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                password=password,
+            ) for i in range(count)
+        ), batch_size=1000)
+
+    def create_categories(self, count):
+        first = self.next_number(Category)
+        return Category.objects.bulk_create(
+            Category(name=f'Category {first + i}', slug=slugify(f'Category {first + i}')) for i in range(count)
+        )
+
+    def create_static_pages(self, count):
+        first = self.next_number(StaticPage)
+        pages = []
+        for i in range(count):
+            body = self.paragraphs(5)
+            body_html, body_text, body_excerpt = render_html(body)
+            pages.append(StaticPage(
+                title=f'Page {first + i}', slug=f'page-{first + i}', body=body,
+                body_html=body_html, body_text=body_text, body_excerpt=body_excerpt,
+            ))
+        StaticPage.objects.bulk_create(pages)
+
+    def create_fundraisers(self, count, users, categories, per_fundraiser):
+        fundraisers = []
+        donations = []
+        comments = []
+        for _ in range(count):
+            start_date = self.now - timedelta(days=self.random.uniform(0, 365))
+            end_date = start_date + timedelta(days=self.random.randint(7, 120))
+            name = self.words(self.random.randint(2, 4)).capitalize()
+            description = self.paragraphs(self.random.randint(1, 6))
+            description_html, description_text, description_excerpt = render_html(description)
+            fundraiser = Fundraiser(
+                name=name,
+                slug=slugify(name),
+                description=description,
+                description_html=description_html,
+                description_text=description_text,
+                description_excerpt=description_excerpt,
+                purpose=self.random.randrange(1000, 200000, 100),
+                active=self.random.random() < 0.9,
+                category=self.random.choice(categories),
+                owner=self.random.choice(users),
+                start_date=start_date,
+                end_date=end_date,
+                created_at=start_date - timedelta(hours=self.random.uniform(1, 72)),
+                updated_at=start_date,
+            )
+            last = min(end_date, self.now)
+            own_donations = []
+            for _ in range(self.long_tail(per_fundraiser['transactions'])):
+                created_at = self.moment(start_date, last)
+                own_donations.append(Transaction(
+                    amount=Decimal(self.random.choice((10, 20, 25, 50, 100, 200, 500))),
+                    comment=self.words(self.random.randint(1, 8)) if self.random.random() < 0.3 else '',
+                    user=self.random.choice(users) if self.random.random() < 0.7 else None,
+                    created_at=created_at,
+                    updated_at=created_at,
+                ))
+            fundraiser.collected = sum((donation.amount for donation in own_donations), Decimal(0))
+            fundraiser.transaction_count = len(own_donations)
+            fundraiser.funded_ratio = float(fundraiser.collected) / fundraiser.purpose
+            for _ in range(self.long_tail(per_fundraiser['comments'])):
+                created_at = self.moment(start_date, last)
+                comments.append((fundraiser, Comment(
+                    message=self.words(self.random.randint(3, 30)),
+                    user=self.random.choice(users) if self.random.random() < 0.8 else None,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )))
+            fundraisers.append(fundraiser)
+            donations += [(fundraiser, donation) for donation in own_donations]
+
+        self.bulk_create_dated(Fundraiser, fundraisers)
+        for fundraiser, row in donations + comments:
+            row.fundraiser = fundraiser
+        self.bulk_create_dated(Transaction, [donation for fundraiser, donation in donations], batch_size=5000)
+        self.bulk_create_dated(Comment, [comment for fundraiser, comment in comments], batch_size=5000)
+        return {'fundraisers': len(fundraisers), 'transactions': len(donations), 'comments': len(comments)}
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import translation
+
+from fundraisers.fragments import FRAGMENT_TEMPLATES, render_fragments
+from fundraisers.models import Fundraiser
+
+
+class Command(BaseCommand):
+    help = 'Renders the cached card and detail fragments of every live fundraiser that are not cached yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Fundraiser.objects.live().with_card_data().defer(None).order_by('pk')
+        last_pk = 0
+        count = 0
+        with translation.override(settings.LANGUAGE_CODE):
+            while True:
+                fundraisers = list(queryset.filter(pk__gt=last_pk)[:options['chunk_size']])
+                if not fundraisers:
+                    break
+                render_fragments([(name, fundraiser) for fundraiser in fundraisers for name in FRAGMENT_TEMPLATES])
+                last_pk = fundraisers[-1].pk
+                count += len(fundraisers)
+        self.stdout.write(f'Warmed fragments of {count} fundraisers.')
@@ -0,0 +1,93 @@
+# Generated by Django 4.0.3 on 2026-10-18 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import tinymce.models
+
+
+def fill_totals(apps, schema_editor):
+    Fundraiser = apps.get_model('fundraisers', 'Fundraiser')
+    Transaction = apps.get_model('fundraisers', 'Transaction')
+    totals = Transaction.objects.order_by().values('fundraiser_id').annotate(
+        amount=models.Sum('amount'), count=models.Count('pk'),
+    )
+    for row in totals.iterator():
+        Fundraiser.objects.filter(pk=row['fundraiser_id']).update(
+            collected=row['amount'], transaction_count=row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraisers', '0003_transaction_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fundraiser',
+            name='collected',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Collected'),
+        ),
+        migrations.AddField(
+            model_name='fundraiser',
+            name='transaction_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Name'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='message',
+            field=models.CharField(max_length=500, verbose_name='Message'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='active',
+            field=models.BooleanField(default=False, verbose_name='Active'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='fundraisers.category', verbose_name='Category'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='description',
+            field=tinymce.models.HTMLField(verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='end_date',
+            field=models.DateTimeField(verbose_name='End Date'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Name'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='purpose',
+            field=models.PositiveIntegerField(verbose_name='Purpose'),
+        ),
+        migrations.AlterField(
+            model_name='fundraiser',
+            name='start_date',
+            field=models.DateTimeField(verbose_name='Start Date'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Amount'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='comment',
+            field=models.CharField(blank=True, max_length=500, verbose_name='Comment'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
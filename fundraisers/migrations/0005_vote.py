@@ -0,0 +1,36 @@
+# Generated by Django 4.0.3 on 2026-10-18 12:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('fundraisers', '0004_fundraiser_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(blank=True, max_length=40)),
+                ('value', models.CharField(choices=[('up', 'Up'), ('down', 'Down')], max_length=4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fundraiser', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='fundraisers.fundraiser')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('fundraiser', 'user'), name='unique_user_vote'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('fundraiser', 'session_key'), name='unique_session_vote'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.0.3 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+def deduplicate_slugs(apps, schema_editor):
+    Model = apps.get_model('fundraisers', 'Category')
+    seen = set()
+    for pk, slug in Model.objects.order_by('pk').values_list('pk', 'slug'):
+        if slug in seen:
+            suffix = f'-{pk}'
+            Model.objects.filter(pk=pk).update(slug=slug[:50 - len(suffix)] + suffix)
+        seen.add(slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraisers', '0005_vote'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['fundraiser', '-id'], name='comment_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundraiser',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-id', 'start_date', 'end_date'], name='fundraiser_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundraiser',
+            index=models.Index(condition=models.Q(('active', True)), fields=['category', '-id', 'start_date', 'end_date'], name='fundraiser_category_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundraiser',
+            index=models.Index(fields=['owner', '-id'], name='fundraiser_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['fundraiser', '-id'], name='transaction_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.3 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraisers', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fundraiser',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
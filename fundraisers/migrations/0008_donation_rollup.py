@@ -0,0 +1,39 @@
+# Generated by Django 4.0.3 on 2026-10-18 13:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncDate
+
+
+def fill_rollups(apps, schema_editor):
+    DonationRollup = apps.get_model('fundraisers', 'DonationRollup')
+    Transaction = apps.get_model('fundraisers', 'Transaction')
+    days = Transaction.objects.order_by().values('fundraiser_id', day=TruncDate('created_at')).annotate(
+        amount=models.Sum('amount'), count=models.Count('pk'),
+    )
+    DonationRollup.objects.bulk_create((DonationRollup(**row) for row in days.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraisers', '0007_fundraiser_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count', models.IntegerField(default=0)),
+                ('fundraiser', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='fundraisers.fundraiser')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='donationrollup',
+            constraint=models.UniqueConstraint(fields=('fundraiser', 'day'), name='unique_donation_rollup'),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
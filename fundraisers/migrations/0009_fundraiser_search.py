@@ -0,0 +1,112 @@
+# Generated by Django 4.0.3 on 2026-10-18 13:47
+
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Copied here rather than imported, so the migration keeps creating what it did when it was written.
+# PostgreSQL keeps a weighted tsvector column with a GIN index, SQLite an external content FTS5 table.
+POSTGRESQL_FORWARD = """
+ALTER TABLE fundraisers_fundraiser ADD COLUMN search_vector tsvector;
+CREATE FUNCTION fundraisers_fundraiser_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description_text, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+-- A trigger rather than a generated column, so counter updates do not recompute the vector.
+CREATE TRIGGER fundraisers_fundraiser_search_vector
+    BEFORE INSERT OR UPDATE OF name, description_text ON fundraisers_fundraiser
+    FOR EACH ROW EXECUTE FUNCTION fundraisers_fundraiser_search_vector();
+UPDATE fundraisers_fundraiser SET name = name;
+CREATE INDEX fundraiser_search_idx ON fundraisers_fundraiser USING GIN (search_vector);
+"""
+POSTGRESQL_BACKWARD = """
+DROP TRIGGER fundraisers_fundraiser_search_vector ON fundraisers_fundraiser;
+DROP FUNCTION fundraisers_fundraiser_search_vector();
+ALTER TABLE fundraisers_fundraiser DROP COLUMN search_vector;
+"""
+SQLITE_TABLE = """
+CREATE VIRTUAL TABLE fundraisers_fundraiser_fts USING fts5(
+    name, description_text, content='fundraisers_fundraiser', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER fundraisers_fundraiser_fts_insert AFTER INSERT ON fundraisers_fundraiser BEGIN
+        INSERT INTO fundraisers_fundraiser_fts (rowid, name, description_text)
+        VALUES (new.id, new.name, new.description_text);
+    END
+    """,
+    """
+    CREATE TRIGGER fundraisers_fundraiser_fts_delete AFTER DELETE ON fundraisers_fundraiser BEGIN
+        INSERT INTO fundraisers_fundraiser_fts (fundraisers_fundraiser_fts, rowid, name, description_text)
+        VALUES ('delete', old.id, old.name, old.description_text);
+    END
+    """,
+    """
+    CREATE TRIGGER fundraisers_fundraiser_fts_update AFTER UPDATE OF name, description_text
+    ON fundraisers_fundraiser BEGIN
+        INSERT INTO fundraisers_fundraiser_fts (fundraisers_fundraiser_fts, rowid, name, description_text)
+        VALUES ('delete', old.id, old.name, old.description_text);
+        INSERT INTO fundraisers_fundraiser_fts (rowid, name, description_text)
+        VALUES (new.id, new.name, new.description_text);
+    END
+    """,
+]
+SQLITE_REBUILD = "INSERT INTO fundraisers_fundraiser_fts (fundraisers_fundraiser_fts) VALUES ('rebuild')"
+SQLITE_DROP_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS fundraisers_fundraiser_fts_insert',
+    'DROP TRIGGER IF EXISTS fundraisers_fundraiser_fts_delete',
+    'DROP TRIGGER IF EXISTS fundraisers_fundraiser_fts_update',
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, [POSTGRESQL_FORWARD])
+    elif vendor == 'sqlite':
+        _execute(schema_editor, [SQLITE_TABLE, *SQLITE_TRIGGERS, SQLITE_REBUILD])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, [POSTGRESQL_BACKWARD])
+    elif vendor == 'sqlite':
+        _execute(schema_editor, [*SQLITE_DROP_TRIGGERS, 'DROP TABLE fundraisers_fundraiser_fts'])
+
+
+def fill_description_text(apps, schema_editor):
+    Fundraiser = apps.get_model('fundraisers', 'Fundraiser')
+    for fundraiser in Fundraiser.objects.only('description').iterator():
+        text = re.sub(r'\s+', ' ', html.unescape(strip_tags(fundraiser.description.replace('<', ' <')))).strip()
+        Fundraiser.objects.filter(pk=fundraiser.pk).update(description_text=text)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraisers', '0008_donation_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fundraiser',
+            name='description_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_description_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.3 on 2026-10-18 13:53
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+def fill_funded_ratio(apps, schema_editor):
+    Fundraiser = apps.get_model('fundraisers', 'Fundraiser')
+    Fundraiser.objects.update(
+        funded_ratio=Coalesce(Cast(F('collected'), FloatField()) / NullIf(F('purpose'), 0), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraisers', '0009_fundraiser_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fundraiser',
+            name='funded_ratio',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fundraiser',
+            name='trending',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_funded_ratio, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donationrollup',
+            index=models.Index(fields=['day'], name='donation_rollup_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundraiser',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-trending', '-id', 'start_date', 'end_date'], name='fundraiser_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundraiser',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-funded_ratio', '-id', 'start_date', 'end_date'], name='fundraiser_funded_idx'),
+        ),
+    ]
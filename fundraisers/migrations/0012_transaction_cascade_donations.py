@@ -0,0 +1,26 @@
+# Generated by Django 4.0.3 on 2026-10-18 15:43
+
+from django.conf import settings
+from django.db import migrations, models
+import fundraisers.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('fundraisers', '0011_fundraiser_rendered_description'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='fundraiser',
+            field=models.ForeignKey(on_delete=fundraisers.models.cascade_donations, to='fundraisers.fundraiser'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=fundraisers.models.cascade_donations, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,29 +1,97 @@
-from django.db import models
-from django.db.models import Sum
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, models, transaction as db_transaction, IntegrityError, NotSupportedError
+from django.db.models import BooleanField, Case, Count, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.deletion import Collector
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.auth.models import User
 from tinymce.models import HTMLField
 from django.utils.translation import gettext_lazy as _
 
+from fundraisers import votes as vote_buffer
+from pomozemy.sanitizer import render_html
+
 
 class Category(models.Model):
     name = models.CharField(max_length=50, verbose_name=_('Name'))
-    slug = models.SlugField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if Category.objects.filter(slug=slugify(self.name)).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': _('A category with this name already exists.')})
+
     def save(self, *args, **kwargs):
+        adding = self._state.adding
         self.slug = slugify(self.name)
         super(Category, self).save(*args, **kwargs)
+        if not adding:
+            self.fundraiser_set.update(revision=F('revision') + 1)
+
+
+class FundraiserQuerySet(models.QuerySet):
+    def live(self):
+        now = timezone.now()
+        return self.filter(active=True, start_date__lte=now, end_date__gte=now)
+
+    def with_card_data(self):
+        # A correlated count keeps GROUP BY out of the outer query, so it stays an ordered index scan.
+        comment_count = Comment.objects.filter(fundraiser=OuterRef('pk')).order_by().values('fundraiser').annotate(
+            count=Count('pk'),
+        ).values('count')
+        return self.select_related('category', 'owner').defer(
+            'description', 'description_html', 'description_text',
+        ).annotate(
+            comment_count=Coalesce(Subquery(comment_count), 0),
+        )
+
+    def search(self, query):
+        """Full-text match on name and description, annotated with a `rank` where higher is better."""
+        if not query.split():
+            return self.annotate(rank=Value(0.0, output_field=FloatField())).none()
+        table = self.model._meta.db_table
+        vendor = connections[self.db].vendor
+        if vendor == 'postgresql':
+            # search_vector is maintained by a trigger, see migration 0009. ts_rank returns a real, cast to the
+            # double precision of Python floats so the rank in a pagination cursor compares equal to the row's.
+            tsquery = "websearch_to_tsquery('simple', %s)"
+            return self.filter(
+                RawSQL(f'{table}.search_vector @@ {tsquery}', [query], output_field=BooleanField()),
+            ).annotate(rank=RawSQL(
+                f'ts_rank({table}.search_vector, {tsquery})::float8', [query], output_field=FloatField(),
+            ))
+        if vendor == 'sqlite':
+            # The FTS5 table is kept up to date by triggers, see fundraisers/search_index.py.
+            # Every word quoted, so user input is never parsed as FTS5 query syntax.
+            terms = ' '.join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+            index = f'{table}_fts'
+            return self.filter(
+                pk__in=RawSQL(f'SELECT rowid FROM {index} WHERE {index} MATCH %s', [terms]),
+            ).annotate(rank=RawSQL(
+                f'SELECT -bm25({index}, 10.0, 1.0) FROM {index} WHERE {index} MATCH %s AND rowid = {table}.id',
+                [terms], output_field=FloatField(),
+            ))
+        raise NotSupportedError(f'Full-text search is not implemented for {vendor}.')
 
 
 class Fundraiser(models.Model):
     name = models.CharField(max_length=50, verbose_name=_('Name'))
     slug = models.SlugField(max_length=50)
     description = HTMLField(verbose_name=_('Description'))
+    # Rendered from the description on save: sanitized HTML for the detail page, plain text for the
+    # full-text index and an excerpt for the list cards.
+    description_html = models.TextField(blank=True, editable=False)
+    description_text = models.TextField(blank=True, editable=False)
+    description_excerpt = models.CharField(max_length=255, blank=True, editable=False)
     purpose = models.PositiveIntegerField(verbose_name=_('Purpose'))
     active = models.BooleanField(default=False, verbose_name=_('Active'))
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name=_('Category'))
@@ -32,41 +100,307 @@ class Fundraiser(models.Model):
     end_date = models.DateTimeField(verbose_name=_('End Date'))
     votes_positive = models.PositiveIntegerField(default=0)
     votes_negative = models.PositiveIntegerField(default=0)
+    collected = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_('Collected'))
+    transaction_count = models.PositiveIntegerField(default=0)
+    # Sort keys of the list pages: collected / purpose, kept with the totals, and the score refreshed by
+    # ``manage.py refresh_trending``.
+    funded_ratio = models.FloatField(default=0)
+    trending = models.FloatField(default=0)
+    # Bumped whenever anything shown in the cached fragments changes.
+    revision = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = FundraiserQuerySet.as_manager()
+
+    # Maintained with atomic UPDATE statements, never written back from a stale instance.
+    counter_fields = (
+        'collected', 'transaction_count', 'votes_positive', 'votes_negative', 'revision', 'funded_ratio', 'trending',
+    )
+
+    class Meta:
+        indexes = [
+            # List: active and running now, newest first.
+            models.Index(
+                fields=['-id', 'start_date', 'end_date'], condition=Q(active=True), name='fundraiser_live_idx',
+            ),
+            # CategoryList: the same filter within one category.
+            models.Index(
+                fields=['category', '-id', 'start_date', 'end_date'], condition=Q(active=True),
+                name='fundraiser_category_live_idx',
+            ),
+            # List sorted by trending or nearly funded, the same filter as fundraiser_live_idx.
+            models.Index(
+                fields=['-trending', '-id', 'start_date', 'end_date'], condition=Q(active=True),
+                name='fundraiser_trending_idx',
+            ),
+            models.Index(
+                fields=['-funded_ratio', '-id', 'start_date', 'end_date'], condition=Q(active=True),
+                name='fundraiser_funded_idx',
+            ),
+            # MyList: all fundraisers of one owner, newest first.
+            models.Index(fields=['owner', '-id'], name='fundraiser_owner_idx'),
+        ]
+
     def __str__(self):
         return f'({self.pk}){self.name}'
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.name)
+        self.description_html, self.description_text, self.description_excerpt = render_html(self.description)
+        updating = self.pk and not self._state.adding
+        if updating and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
         super(Fundraiser, self).save(*args, **kwargs)
+        if updating:
+            # The purpose may have changed.
+            Fundraiser.objects.filter(pk=self.pk).update(
+                revision=F('revision') + 1, funded_ratio=Fundraiser.funded_ratio_of(F('collected')),
+            )
+
+    @classmethod
+    def bump_revision(cls, pk):
+        cls.objects.filter(pk=pk).update(revision=F('revision') + 1)
+
+    @staticmethod
+    def funded_ratio_of(collected):
+        # SQL for collected / purpose, 0 while the purpose is 0.
+        return Coalesce(Cast(collected, FloatField()) / NullIf(F('purpose'), 0), Value(0.0))
 
-    def transaction_sum(self):
-        return self.transaction_set.all().aggregate(Sum('amount'))['amount__sum'] or 0
+    @classmethod
+    def add_to_totals(cls, pk, amount, count):
+        collected = F('collected') + Decimal(amount)
+        cls.objects.filter(pk=pk).update(
+            collected=collected,
+            funded_ratio=cls.funded_ratio_of(collected),
+            transaction_count=F('transaction_count') + count,
+            revision=F('revision') + 1,
+        )
+
+    def vote(self, value, user=None, session_key=''):
+        if value not in Vote.Value.values:
+            return False
+        voter = {'user': user} if user else {'user': None, 'session_key': session_key}
+        with db_transaction.atomic():
+            changed = Vote.objects.filter(fundraiser=self, **voter).exclude(value=value).update(value=value)
+            if changed:
+                self.count_votes(value, 1, revoked=1)
+                return True
+            try:
+                with db_transaction.atomic():
+                    Vote.objects.create(fundraiser=self, value=value, **voter)
+            except IntegrityError:
+                return False
+            self.count_votes(value, 1)
+        return True
+
+    def count_votes(self, value, count, revoked=0):
+        if value == Vote.Value.UP:
+            counted, other = 'votes_positive', 'votes_negative'
+        else:
+            counted, other = 'votes_negative', 'votes_positive'
+        if settings.VOTE_BUFFERING:
+            deltas = {counted: count, other: -revoked}
+            # Buffered once the Vote row is committed, so a rolled back vote is never counted.
+            db_transaction.on_commit(lambda: vote_buffer.add(self.pk, **deltas))
+            return
+        updates = {counted: F(counted) + count, 'revision': F('revision') + 1}
+        if revoked:
+            updates[other] = F(other) - revoked
+        Fundraiser.objects.filter(pk=self.pk).update(**updates)
+
+    @classmethod
+    def add_to_totals_many(cls, totals):
+        # One statement for a whole batch: {pk: (amount, count)}.
+        if not totals:
+            return
+        collected = Case(
+            *(When(pk=pk, then=Value(Decimal(amount))) for pk, (amount, count) in totals.items()),
+            output_field=cls._meta.get_field('collected'),
+        )
+        transaction_count = Case(
+            *(When(pk=pk, then=Value(count)) for pk, (amount, count) in totals.items()),
+            output_field=models.PositiveIntegerField(),
+        )
+        collected = F('collected') + collected
+        cls.objects.filter(pk__in=totals).update(
+            collected=collected,
+            funded_ratio=cls.funded_ratio_of(collected),
+            transaction_count=F('transaction_count') + transaction_count,
+            revision=F('revision') + 1,
+        )
+
+    @classmethod
+    def add_votes_many(cls, deltas):
+        # One statement for a whole batch of buffered votes: {pk: {field: delta}}.
+        if not deltas:
+            return
+        cls.objects.filter(pk__in=deltas).update(
+            revision=F('revision') + 1,
+            **{
+                field: F(field) + Case(
+                    *(When(pk=pk, then=Value(fields.get(field, 0))) for pk, fields in deltas.items()),
+                    output_field=models.IntegerField(),
+                ) for field in vote_buffer.FIELDS
+            },
+        )
 
     def upvote(self):
-        self.votes_positive += 1
-        self.save()
+        self.count_votes(Vote.Value.UP, 1)
 
     def downvote(self):
-        self.votes_negative += 1
-        self.save()
+        self.count_votes(Vote.Value.DOWN, 1)
+
+
+def cascade_donations(collector, field, sub_objs, using):
+    """CASCADE that leaves the totals of the donations to the deleted fundraiser or donor, see signals.py."""
+    for donation in sub_objs:
+        donation._totals_handled = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
+class TransactionQuerySet(models.QuerySet):
+    def delete(self):
+        # The donations are taken off the totals at once, their delete signals leave them alone.
+        with db_transaction.atomic(using=self.db):
+            donations = list(self.select_for_update())
+            Transaction.subtract_donations(
+                {'fundraiser_id': donation.fundraiser_id, 'amount': donation.amount, 'created_at': donation.created_at}
+                for donation in donations
+            )
+            for donation in donations:
+                donation._totals_handled = True
+            collector = Collector(using=self.db)
+            collector.collect(donations)
+            return collector.delete()
 
 
 class Transaction(models.Model):
-    fundraiser = models.ForeignKey(Fundraiser, on_delete=models.CASCADE)
+    fundraiser = models.ForeignKey(Fundraiser, on_delete=cascade_donations)
     comment = models.CharField(max_length=500, blank=True, verbose_name=_('Comment'))
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_('Amount'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
+    user = models.ForeignKey(User, on_delete=cascade_donations, blank=True, null=True)
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fundraiser', '-id'], name='transaction_feed_idx'),
+        ]
 
     def get_user_name(self):
         if self.user:
             return self.user.get_full_name()
         return 'Anonymous'
 
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            previous = None
+            if self.pk and not self._state.adding:
+                previous = Transaction.objects.select_for_update().filter(pk=self.pk).values(
+                    'fundraiser_id', 'amount', 'created_at'
+                ).first()
+            super(Transaction, self).save(*args, **kwargs)
+            if previous:
+                Fundraiser.add_to_totals(previous['fundraiser_id'], -previous['amount'], -1)
+            Fundraiser.add_to_totals(self.fundraiser_id, self.amount, 1)
+            if previous:
+                DonationRollup.add(
+                    previous['fundraiser_id'], timezone.localdate(previous['created_at']), -previous['amount'], -1,
+                )
+            DonationRollup.add(self.fundraiser_id, timezone.localdate(self.created_at), self.amount, 1)
+
+    @staticmethod
+    def subtract_donations(donations):
+        """Takes deleted donations, as fundraiser_id, amount and created_at dicts, off the totals and rollups."""
+        totals = {}
+        days = {}
+        for donation in donations:
+            fundraiser_id = donation['fundraiser_id']
+            amount, count = totals.get(fundraiser_id, (0, 0))
+            totals[fundraiser_id] = (amount - donation['amount'], count - 1)
+            day = (fundraiser_id, timezone.localdate(donation['created_at']))
+            amount, count = days.get(day, (0, 0))
+            days[day] = (amount - donation['amount'], count - 1)
+        # One statement for all the fundraisers, which locks them before their rollups are changed.
+        Fundraiser.add_to_totals_many(totals)
+        DonationRollup.add_many(days)
+
+
+class DonationRollup(models.Model):
+    """Donations of one fundraiser summed per day, kept current by Transaction for the history charts."""
+    fundraiser = models.ForeignKey(Fundraiser, on_delete=models.CASCADE)
+    day = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fundraiser', 'day'], name='unique_donation_rollup'),
+        ]
+        indexes = [
+            # The recent days of all fundraisers, for the trending scores.
+            models.Index(fields=['day'], name='donation_rollup_day_idx'),
+        ]
+
+    @classmethod
+    def add(cls, fundraiser_id, day, amount, count):
+        # Called after the fundraiser's totals were updated, so concurrent donations to it are serialised.
+        rollup = cls.objects.filter(fundraiser_id=fundraiser_id, day=day)
+        updates = {'amount': F('amount') + Decimal(amount), 'count': F('count') + count}
+        if rollup.update(**updates):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(fundraiser_id=fundraiser_id, day=day, amount=amount, count=count)
+        except IntegrityError:
+            rollup.update(**updates)
+
+    @classmethod
+    def subtract(cls, fundraiser_id, day, amount, count):
+        # Never creates a row, when the fundraiser is being deleted its rollups may already be gone.
+        cls.objects.filter(fundraiser_id=fundraiser_id, day=day).update(
+            amount=F('amount') - Decimal(amount), count=F('count') - count,
+        )
+
+    @classmethod
+    def add_many(cls, days):
+        # {(fundraiser_id, day): (amount, count)}, the caller already holds the fundraisers' row locks.
+        if not days:
+            return
+        existing = {
+            (rollup.fundraiser_id, rollup.day): rollup for rollup in cls.objects.filter(
+                fundraiser_id__in={fundraiser_id for fundraiser_id, day in days},
+                day__in={day for fundraiser_id, day in days},
+            ).only('fundraiser_id', 'day')
+        }
+        updated = []
+        created = []
+        for (fundraiser_id, day), (amount, count) in days.items():
+            rollup = existing.get((fundraiser_id, day))
+            if rollup is None:
+                created.append(cls(fundraiser_id=fundraiser_id, day=day, amount=amount, count=count))
+            else:
+                rollup.amount = F('amount') + Decimal(amount)
+                rollup.count = F('count') + count
+                updated.append(rollup)
+        cls.objects.bulk_update(updated, ['amount', 'count'], batch_size=1000)
+        cls.objects.bulk_create(created, batch_size=1000)
+
+
+class CommentQuerySet(models.QuerySet):
+    def delete(self):
+        with db_transaction.atomic():
+            fundraisers = list(self.order_by().values_list('fundraiser_id', flat=True).distinct())
+            result = super().delete()
+            Fundraiser.objects.filter(pk__in=fundraisers).update(revision=F('revision') + 1)
+        return result
+
 
 class Comment(models.Model):
     message = models.CharField(max_length=500, verbose_name=_('Message'))
@@ -75,7 +409,48 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fundraiser', '-id'], name='comment_feed_idx'),
+        ]
+
     def get_user_name(self):
         if self.user:
             return self.user.get_full_name()
         return 'Anonymous'
+
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            super(Comment, self).save(*args, **kwargs)
+            Fundraiser.bump_revision(self.fundraiser_id)
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            result = super(Comment, self).delete(*args, **kwargs)
+            Fundraiser.bump_revision(self.fundraiser_id)
+        return result
+
+
+class Vote(models.Model):
+    class Value(models.TextChoices):
+        UP = 'up'
+        DOWN = 'down'
+
+    fundraiser = models.ForeignKey(Fundraiser, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
+    session_key = models.CharField(max_length=40, blank=True)
+    value = models.CharField(max_length=4, choices=Value.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fundraiser', 'user'], condition=Q(user__isnull=False), name='unique_user_vote',
+            ),
+            models.UniqueConstraint(
+                fields=['fundraiser', 'session_key'], condition=Q(user__isnull=True), name='unique_session_vote',
+            ),
+        ]
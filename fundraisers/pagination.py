@@ -0,0 +1,120 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+FEED_PAGE_SIZE = 20
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, key, has_next, has_previous):
+        self.object_list = object_list
+        self.key = key
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor('next', self.key(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor('previous', self.key(self.object_list[0]))
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page, ordering='-pk'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        if self.field == 'id':
+            self.field = 'pk'
+
+    def key(self, obj):
+        if self.field == 'pk':
+            return [obj.pk]
+        return [getattr(obj, self.field), obj.pk]
+
+    def _ordering(self, descending):
+        prefix = '-' if descending else ''
+        if self.field == 'pk':
+            return [f'{prefix}pk']
+        return [f'{prefix}{self.field}', f'{prefix}pk']
+
+    def _seek(self, key, descending):
+        lookup = 'lt' if descending else 'gt'
+        if self.field == 'pk':
+            return Q(**{f'pk__{lookup}': key[0]})
+        value, pk = key
+        return Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'pk__{lookup}': pk})
+
+    def page(self, cursor=None):
+        if not cursor:
+            direction, key = 'next', None
+        else:
+            direction, key = decode_cursor(cursor, len(self._ordering(True)))
+        backwards = direction == 'previous'
+        descending = self.descending != backwards
+
+        queryset = self.queryset.order_by(*self._ordering(descending))
+        if key is not None:
+            try:
+                queryset = queryset.filter(self._seek(key, descending))
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidCursor('Invalid cursor.')
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if backwards:
+            object_list.reverse()
+            return KeysetPage(object_list, self.key, has_next=True, has_previous=has_more)
+        return KeysetPage(object_list, self.key, has_next=has_more, has_previous=key is not None)
+
+
+def feed_page(queryset, cursor=None, per_page=FEED_PAGE_SIZE):
+    try:
+        return KeysetPaginator(queryset.select_related('user'), per_page).page(cursor)
+    except InvalidCursor as error:
+        raise Http404(str(error))
+
+
+def encode_cursor(direction, key):
+    data = json.dumps([direction, key], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, key_length):
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, key = json.loads(data)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor.')
+    if direction not in ('next', 'previous') or not isinstance(key, list) or len(key) != key_length:
+        raise InvalidCursor('Invalid cursor.')
+    return direction, key
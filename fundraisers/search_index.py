@@ -0,0 +1,59 @@
+"""
+SQLite triggers keeping the full-text table behind FundraiserQuerySet.search() in sync with the fundraisers.
+
+Migration 0009 creates the FTS5 table and the triggers. Django rebuilds the fundraiser table for most schema
+changes on SQLite, forwards or backwards, and the triggers are dropped with it. They are checked after every
+migrate and, when one is missing, recreated and the index rebuilt, so migrations need not restore them.
+PostgreSQL keeps its trigger through table changes.
+"""
+from django.db import connections
+
+TABLE = 'fundraisers_fundraiser'
+INDEX = 'fundraisers_fundraiser_fts'
+TRIGGERS = {
+    'fundraisers_fundraiser_fts_insert': """
+    CREATE TRIGGER fundraisers_fundraiser_fts_insert AFTER INSERT ON fundraisers_fundraiser BEGIN
+        INSERT INTO fundraisers_fundraiser_fts (rowid, name, description_text)
+        VALUES (new.id, new.name, new.description_text);
+    END
+    """,
+    'fundraisers_fundraiser_fts_delete': """
+    CREATE TRIGGER fundraisers_fundraiser_fts_delete AFTER DELETE ON fundraisers_fundraiser BEGIN
+        INSERT INTO fundraisers_fundraiser_fts (fundraisers_fundraiser_fts, rowid, name, description_text)
+        VALUES ('delete', old.id, old.name, old.description_text);
+    END
+    """,
+    'fundraisers_fundraiser_fts_update': """
+    CREATE TRIGGER fundraisers_fundraiser_fts_update AFTER UPDATE OF name, description_text
+    ON fundraisers_fundraiser BEGIN
+        INSERT INTO fundraisers_fundraiser_fts (fundraisers_fundraiser_fts, rowid, name, description_text)
+        VALUES ('delete', old.id, old.name, old.description_text);
+        INSERT INTO fundraisers_fundraiser_fts (rowid, name, description_text)
+        VALUES (new.id, new.name, new.description_text);
+    END
+    """,
+}
+
+
+def restore_sqlite_triggers(using='default'):
+    """Recreates missing triggers and rebuilds the index, which may have missed changes. Returns whether it did."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE tbl_name IN (%s, %s)", [TABLE, INDEX])
+        existing = cursor.fetchall()
+        # Before migration 0009 or after it was reverted.
+        if ('table', INDEX) not in existing:
+            return False
+        if all(('trigger', name) in existing for name in TRIGGERS):
+            return False
+        for name, statement in TRIGGERS.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {INDEX} ({INDEX}) VALUES ('rebuild')")
+    return True
+
+
+def restore_after_migrate(sender, using, **kwargs):
+    restore_sqlite_triggers(using)
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from fundraisers.context_processors import invalidate_nav_categories
+from fundraisers.models import Category, Fundraiser, Transaction
+from pomozemy.form_cache import invalidate_forms
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Fundraiser)
+def nav_categories_changed(sender, **kwargs):
+    invalidate_nav_categories()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_choices_changed(sender, **kwargs):
+    invalidate_forms('categories')
+
+
+@receiver(post_save, sender=User)
+def owner_renamed(sender, instance, created, update_fields=None, **kwargs):
+    # The cached fragments show the owner's name. Saves of other fields only, like last_login, keep them.
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    Fundraiser.objects.filter(owner=instance).update(revision=F('revision') + 1)
+
+
+@receiver(pre_delete, sender=Transaction)
+def transaction_deleting(sender, instance, **kwargs):
+    if getattr(instance, '_totals_handled', False):
+        return
+    # The stored values, the instance being deleted may be stale. Deletes run in a transaction.
+    instance._stored_donation = Transaction.objects.select_for_update().filter(pk=instance.pk).values(
+        'fundraiser_id', 'amount', 'created_at',
+    ).first()
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    # Single deletes only: bulk deletes and cascades from the fundraiser or the donor set _totals_handled.
+    stored = getattr(instance, '_stored_donation', None)
+    if stored is not None:
+        Transaction.subtract_donations([stored])
+
+
+@receiver(pre_delete, sender=User)
+def donor_deleting(sender, instance, **kwargs):
+    # Their donations cascade with cascade_donations, their totals are taken off here in one go. Donations to
+    # the donor's own fundraisers are deleted with those.
+    Transaction.subtract_donations(
+        Transaction.objects.select_for_update(of=('self',)).filter(user=instance).exclude(
+            fundraiser__owner=instance,
+        ).values('fundraiser_id', 'amount', 'created_at')
+    )
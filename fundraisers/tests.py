@@ -1,11 +1,35 @@
-from datetime import datetime
+import asyncio
+import csv
+import json
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
 
 import pytest
-from django.test import Client
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command, CommandError
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, transaction as db_transaction
+from django.db.models import F, Sum
+from django.http import Http404
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.timezone import make_aware
 
-from fundraisers.models import Fundraiser, Comment
+from fundraisers import fragments, live, search_index, throttling, votes
+from fundraisers.management.commands import benchmark_urls
+from fundraisers.forms import CommentAddForm, TransactionForm
+from fundraisers.models import Fundraiser, Comment, Transaction, Category, Vote, DonationRollup
+from fundraisers.pagination import KeysetPaginator
+from fundraisers.views import Fundraiser as Fundraiser_views
+from pomozemy import asgi, form_cache
+from pomozemy.asynchronous import database_sync_to_async
+from static_pages.models import StaticPage
 
 
 def _asset_sorted(db_list, view_list, reverse=True):
@@ -14,6 +38,27 @@ def _asset_sorted(db_list, view_list, reverse=True):
     assert view_list_ids == db_sorted_list_ids
 
 
+def _bulk_fundraisers(count, owner, category):
+    now = make_aware(datetime.now())
+    fundraisers = Fundraiser.objects.bulk_create(
+        Fundraiser(
+            name=f'Bulk {i}',
+            slug=f'bulk-{i}',
+            description=f'Bulk description {i}',
+            owner=owner,
+            purpose=100,
+            active=True,
+            start_date=now - timedelta(days=1),
+            end_date=now + timedelta(days=30),
+            category=category,
+        ) for i in range(count)
+    )
+    Comment.objects.bulk_create(
+        Comment(fundraiser=fundraiser, user=owner, message='Bulk comment') for fundraiser in fundraisers
+    )
+    return fundraisers
+
+
 @pytest.mark.django_db
 class TestFundraiserListView:
     def test_all_list(self, client: Client, fundraisers):
@@ -26,7 +71,78 @@ class TestFundraiserListView:
     def test_all_list_empty(self, client: Client):
         response = client.get(reverse('fundraiser_list'))
         assert response.status_code == 200
-        assert response.context['object_list'].count() == 0
+        assert len(response.context['object_list']) == 0
+
+    def test_list_annotations(self, client: Client, fundraisers):
+        Comment.objects.create(fundraiser=fundraisers[0], message='Test message')
+        response = client.get(reverse('fundraiser_list'))
+        for fundraiser in response.context['object_list']:
+            assert fundraiser.comment_count == (1 if fundraiser == fundraisers[0] else 0)
+
+
+@pytest.mark.django_db
+class TestFundraiserListPagination:
+    def test_next_and_previous(self, client: Client, users, categories):
+        fundraisers = _bulk_fundraisers(60, users[0], categories[0])
+        expected = sorted((fundraiser.pk for fundraiser in fundraisers), reverse=True)
+
+        pages = []
+        response = client.get(reverse('fundraiser_list'))
+        while True:
+            page = response.context['page_obj']
+            pages.append([fundraiser.pk for fundraiser in page])
+            if not page.has_next():
+                break
+            response = client.get(reverse('fundraiser_list'), {'cursor': page.next_cursor})
+        assert [pk for page in pages for pk in page] == expected
+        assert [len(page) for page in pages] == [24, 24, 12]
+
+        page = response.context['page_obj']
+        response = client.get(reverse('fundraiser_list'), {'cursor': page.previous_cursor})
+        assert [fundraiser.pk for fundraiser in response.context['page_obj']] == pages[1]
+        page = response.context['page_obj']
+        response = client.get(reverse('fundraiser_list'), {'cursor': page.previous_cursor})
+        assert [fundraiser.pk for fundraiser in response.context['page_obj']] == pages[0]
+        assert not response.context['page_obj'].has_previous()
+
+    def test_no_count_query(self, client: Client, users, categories):
+        _bulk_fundraisers(30, users[0], categories[0])
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('fundraiser_list'))
+        assert not any('COUNT(*)' in query['sql'] for query in context.captured_queries)
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', 'WyJuZXh0IiwgWyJ4Il1d'])
+    def test_invalid_cursor(self, client: Client, cursor):
+        response = client.get(reverse('fundraiser_list'), {'cursor': cursor})
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestFundraiserListQueries:
+    @staticmethod
+    def _count_queries(client, url, size, users):
+        owner = users[0]
+        category = Category.objects.create(name=f'Queries {size}')
+        _bulk_fundraisers(size, owner, category)
+        client.force_login(owner)
+        urls = {
+            'list': reverse('fundraiser_list'),
+            'category': reverse('fundraiser_category_list', kwargs={'slug': category.slug}),
+            'my_list': reverse('fundraiser_my_list'),
+        }
+        client.get(urls[url])
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(urls[url])
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    @pytest.mark.parametrize('url', ['list', 'category', 'my_list'])
+    def test_query_count_constant(self, client: Client, users, url):
+        counts = []
+        for size in (10, 100, 1000):
+            Fundraiser.objects.all().delete()
+            counts.append(self._count_queries(client, url, size, users))
+        assert counts[0] == counts[1] == counts[2]
 
 
 @pytest.mark.django_db
@@ -63,6 +179,62 @@ class TestFundraiserDetailView:
         response = client.get(reverse('fundraiser_detail', kwargs={'pk': 999}))
         assert response.status_code == 404
 
+    def test_detail_feeds(self, client: Client, fundraisers, users):
+        fundraiser = fundraisers[0]
+        transactions = Transaction.objects.bulk_create(
+            Transaction(fundraiser=fundraiser, user=users[i % 2], amount=i + 1) for i in range(45)
+        )
+        Comment.objects.bulk_create(Comment(fundraiser=fundraiser, user=users[0], message=i) for i in range(5))
+
+        client.get(reverse('fundraiser_list'))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(reverse('fundraiser_detail', kwargs={'pk': fundraiser.id}))
+        page = response.context['transactions']
+        assert [transaction.pk for transaction in page] == [transaction.pk for transaction in transactions[:-21:-1]]
+        assert len(response.context['comments']) == 5
+        assert not response.context['comments'].has_next()
+        queries = len(context.captured_queries)
+
+        Transaction.objects.bulk_create(Transaction(fundraiser=fundraiser, user=users[2], amount=1) for i in range(45))
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('fundraiser_detail', kwargs={'pk': fundraiser.id}))
+        assert len(context.captured_queries) == queries
+
+    def test_transaction_feed_load_more(self, client: Client, fundraisers, users):
+        fundraiser = fundraisers[0]
+        Transaction.objects.bulk_create(
+            Transaction(fundraiser=fundraiser, user=users[0], amount=i + 1, comment=f'Donation {i}') for i in range(25)
+        )
+        page = client.get(reverse('fundraiser_detail', kwargs={'pk': fundraiser.id})).context['transactions']
+
+        url = reverse('fundraiser_transaction_list', kwargs={'fundraiser_id': fundraiser.id})
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, {'cursor': page.next_cursor})
+        assert response.status_code == 200
+        assert len(context.captured_queries) == 2
+        content = response.content.decode()
+        assert all(f'Donation {i}' in content for i in range(5))
+        assert 'Donation 5' not in content
+        assert 'data-load-more' not in content
+
+    def test_comment_feed_load_more(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        Comment.objects.bulk_create(Comment(fundraiser=fundraiser, message=f'Comment {i}') for i in range(21))
+        page = client.get(reverse('fundraiser_detail', kwargs={'pk': fundraiser.id})).context['comments']
+        assert page.has_next()
+
+        response = client.get(
+            reverse('fundraiser_comment_list', kwargs={'fundraiser_id': fundraiser.id}), {'cursor': page.next_cursor}
+        )
+        assert response.status_code == 200
+        content = response.content.decode()
+        assert 'Comment 0' in content
+        assert content.count('Comment ') == 1
+
+    def test_feed_not_found(self, client: Client):
+        response = client.get(reverse('fundraiser_comment_list', kwargs={'fundraiser_id': 999}))
+        assert response.status_code == 404
+
 
 @pytest.mark.django_db
 class TestFundraiserMyListView:
@@ -329,6 +501,52 @@ class TestFundraiserVote:
         assert fundraiser.votes_negative == 0
         assert fundraiser.votes_positive == 0
 
+    def test_post__once_per_session(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        url = reverse('fundraiser_vote', kwargs={'fundraiser_id': fundraiser.id})
+        for _ in range(3):
+            client.post(url, {'vote': 'up'})
+        Client().post(url, {'vote': 'up'})
+
+        fundraiser.refresh_from_db()
+        assert fundraiser.votes_positive == 2
+        assert Vote.objects.filter(fundraiser=fundraiser, user=None).count() == 2
+
+    def test_post__once_per_user(self, client: Client, fundraisers, users):
+        fundraiser = fundraisers[0]
+        url = reverse('fundraiser_vote', kwargs={'fundraiser_id': fundraiser.id})
+        client.force_login(users[1])
+        client.post(url, {'vote': 'up'})
+        client.logout()
+        client.force_login(users[1])
+        client.post(url, {'vote': 'up'})
+
+        fundraiser.refresh_from_db()
+        assert fundraiser.votes_positive == 1
+        assert Vote.objects.get(fundraiser=fundraiser).user == users[1]
+
+    def test_post__change_vote(self, client: Client, fundraisers, users):
+        fundraiser = fundraisers[0]
+        url = reverse('fundraiser_vote', kwargs={'fundraiser_id': fundraiser.id})
+        client.force_login(users[1])
+        client.post(url, {'vote': 'up'})
+        client.post(url, {'vote': 'down'})
+
+        fundraiser.refresh_from_db()
+        assert (fundraiser.votes_positive, fundraiser.votes_negative) == (0, 1)
+        assert Vote.objects.get(fundraiser=fundraiser).value == Vote.Value.DOWN
+
+    def test_post__updates_only_counters(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        with CaptureQueriesContext(connection) as context:
+            client.post(reverse('fundraiser_vote', kwargs={'fundraiser_id': fundraiser.id}), {'vote': 'up'})
+        updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "fundraisers_fundraiser"')
+        ]
+        assert len(updates) == 1
+        assert 'description' not in updates[0]
+
 
 @pytest.mark.django_db
 class TestFundraiserTransactionAddView:
@@ -407,3 +625,936 @@ class TestFundraiserTransactionAddView:
 
         fundraiser.refresh_from_db()
         assert fundraiser.transaction_set.count() == 0
+
+
+@pytest.mark.django_db
+class TestFundraiserTotals:
+    def test__transaction_add__updates_totals(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        for amount in ('100', '25.50'):
+            client.post(
+                reverse('fundraiser_transaction_add', kwargs={'fundraiser_id': fundraiser.id}),
+                {'amount': amount, 'comment': ''},
+            )
+
+        fundraiser.refresh_from_db()
+        assert fundraiser.collected == 125.50
+        assert fundraiser.transaction_count == 2
+        assert fundraiser.collected == fundraiser.transaction_set.aggregate(Sum('amount'))['amount__sum']
+
+    def test__transaction_edit__moves_totals(self, fundraisers):
+        transaction = Transaction.objects.create(fundraiser=fundraisers[0], amount=100)
+        transaction.amount = 40
+        transaction.fundraiser = fundraisers[1]
+        transaction.save()
+
+        fundraisers[0].refresh_from_db()
+        fundraisers[1].refresh_from_db()
+        assert (fundraisers[0].collected, fundraisers[0].transaction_count) == (0, 0)
+        assert (fundraisers[1].collected, fundraisers[1].transaction_count) == (40, 1)
+
+    def test__transaction_delete__updates_totals(self, fundraisers):
+        fundraiser = fundraisers[0]
+        first = Transaction.objects.create(fundraiser=fundraiser, amount=100)
+        for amount in (10, 20):
+            Transaction.objects.create(fundraiser=fundraiser, amount=amount)
+
+        first.delete()
+        fundraiser.refresh_from_db()
+        assert (fundraiser.collected, fundraiser.transaction_count) == (30, 2)
+
+        Transaction.objects.filter(fundraiser=fundraiser).delete()
+        fundraiser.refresh_from_db()
+        assert (fundraiser.collected, fundraiser.transaction_count) == (0, 0)
+
+    def test__donor_delete__updates_totals(self, users, fundraisers):
+        fundraiser = fundraisers[0]
+        donor = users[1]
+        stale = Transaction.objects.create(fundraiser=fundraiser, amount=100, user=donor)
+        Transaction.objects.create(fundraiser=fundraiser, amount=20, user=donor)
+        Transaction.objects.create(fundraiser=fundraiser, amount=5)
+        Transaction.objects.filter(pk=stale.pk).update(amount=50)
+        Fundraiser.objects.filter(pk=fundraiser.pk).update(collected=75)
+        DonationRollup.objects.filter(fundraiser=fundraiser).update(amount=75)
+
+        # The stored amount is subtracted, not the stale one.
+        stale.delete()
+        fundraiser.refresh_from_db()
+        assert (fundraiser.collected, fundraiser.transaction_count) == (25, 2)
+
+        # Their donations to their own fundraiser go with it.
+        assert fundraisers[1].owner == donor
+        Transaction.objects.create(fundraiser=fundraisers[1], amount=30, user=donor)
+        Transaction.objects.create(fundraiser=fundraiser, amount=40, user=donor)
+        with CaptureQueriesContext(connection) as context:
+            User.objects.get(pk=donor.pk).delete()
+        fundraiser.refresh_from_db()
+        assert (fundraiser.collected, fundraiser.transaction_count) == (5, 1)
+        assert fundraiser.funded_ratio == 0.05
+        rollup = DonationRollup.objects.get(fundraiser=fundraiser)
+        assert (rollup.amount, rollup.count) == (5, 1)
+        assert len([query for query in context.captured_queries if 'fundraisers_fundraiser" SET' in query['sql']]) == 1
+
+    def test__fundraiser_delete__no_donation_updates(self, fundraisers):
+        fundraiser = fundraisers[0]
+        Transaction.objects.bulk_create(Transaction(fundraiser=fundraiser, amount=1) for _ in range(10))
+        with CaptureQueriesContext(connection) as context:
+            fundraiser.delete()
+        assert not [query for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        assert not Transaction.objects.filter(fundraiser_id=fundraiser.pk).exists()
+
+    def test__transaction_bulk_delete__one_update(self, fundraisers):
+        for fundraiser in fundraisers[:3]:
+            for amount in (10, 20):
+                Transaction.objects.create(fundraiser=fundraiser, amount=amount)
+        with CaptureQueriesContext(connection) as context:
+            Transaction.objects.filter(fundraiser__in=fundraisers[:2]).delete()
+        assert len([query for query in context.captured_queries if 'fundraisers_fundraiser" SET' in query['sql']]) == 1
+        totals = Fundraiser.objects.filter(pk__in=[fundraiser.pk for fundraiser in fundraisers[:3]]).order_by('pk')
+        assert list(totals.values_list('collected', 'transaction_count')) == [(0, 0), (0, 0), (30, 2)]
+        assert list(DonationRollup.objects.order_by('fundraiser_id').values_list('amount', 'count')) == [
+            (0, 0), (0, 0), (30, 2),
+        ]
+
+    def test__fundraiser_save__keeps_totals(self, fundraisers):
+        fundraiser = Fundraiser.objects.get(pk=fundraisers[0].pk)
+        Transaction.objects.create(fundraiser=fundraiser, amount=100)
+        fundraiser.name = 'Renamed'
+        fundraiser.save()
+
+        fundraiser.refresh_from_db()
+        assert fundraiser.collected == 100
+
+    def test__recompute_totals(self, fundraisers):
+        Transaction.objects.create(fundraiser=fundraisers[0], amount=100)
+        Fundraiser.objects.filter(pk=fundraisers[0].pk).update(collected=5, transaction_count=3)
+        revisions = dict(Fundraiser.objects.values_list('pk', 'revision'))
+
+        with pytest.raises(CommandError):
+            call_command('recompute_totals', '--check', chunk_size=3)
+        call_command('recompute_totals', chunk_size=3)
+        call_command('recompute_totals', '--check', chunk_size=3)
+
+        fundraisers[0].refresh_from_db()
+        assert (fundraisers[0].collected, fundraisers[0].transaction_count) == (100, 1)
+        # Only the repaired fundraiser's cached fragments are dropped.
+        revisions[fundraisers[0].pk] += 1
+        assert dict(Fundraiser.objects.values_list('pk', 'revision')) == revisions
+
+
+@pytest.mark.django_db
+class TestNavigationCache:
+    def test_nav_categories_cached(self, client: Client, fundraisers, categories):
+        response = client.get(reverse('fundraiser_list'))
+        assert [category['slug'] for category in response.context['categories']] == [
+            category.slug for category in categories
+        ]
+        assert all(category['live_count'] == 1 for category in response.context['categories'])
+
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('fundraiser_create'))
+        assert not any('fundraisers_category' in query['sql'] for query in context.captured_queries)
+
+    def test_nav_categories_invalidated(self, client: Client, fundraisers, categories):
+        client.get(reverse('fundraiser_list'))
+        Category.objects.create(name='New category')
+        fundraisers[0].active = False
+        fundraisers[0].save()
+
+        response = client.get(reverse('fundraiser_list'))
+        nav = {category['slug']: category['live_count'] for category in response.context['categories']}
+        assert nav['new-category'] == 0
+        assert nav[categories[0].slug] == 0
+        assert nav[categories[1].slug] == 1
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    def test_no_sequential_scans(self):
+        users = User.objects.bulk_create(User(username=f'plan{i}') for i in range(200))
+        categories = [Category.objects.create(name=f'Plan {i}') for i in range(20)]
+        fundraisers = []
+        for i, category in enumerate(categories):
+            fundraisers += _bulk_fundraisers(150, users[i], category)
+        Fundraiser.objects.filter(pk__in=[fundraiser.pk for fundraiser in fundraisers[::4]]).update(active=False)
+        Transaction.objects.bulk_create(
+            Transaction(fundraiser=fundraisers[i % 50], user=users[i % 200], amount=10) for i in range(3000)
+        )
+        StaticPage.objects.bulk_create(StaticPage(title=i, slug=f'page-{i}', body=i) for i in range(50))
+
+        call_command('check_query_plans')
+
+    def test_unique_category_slug(self, categories):
+        with pytest.raises(ValidationError) as error:
+            Category(name=categories[0].name).full_clean()
+        assert 'name' in error.value.message_dict
+
+
+@pytest.mark.django_db
+class TestFragmentCache:
+    @pytest.fixture
+    def rendered(self, monkeypatch):
+        rendered = []
+        render_fragment = fragments.render_fragment
+
+        def spy(name, fundraiser):
+            rendered.append((name, fundraiser.pk))
+            return render_fragment(name, fundraiser)
+
+        monkeypatch.setattr(fragments, 'render_fragment', spy)
+        return rendered
+
+    def test_cards_cached(self, client: Client, fundraisers, rendered):
+        client.get(reverse('fundraiser_list'))
+        assert len(rendered) == len(fundraisers)
+
+        rendered.clear()
+        response = client.get(reverse('fundraiser_list'))
+        assert rendered == []
+        assert reverse('fundraiser_detail', kwargs={'pk': fundraisers[0].id}) in response.content.decode()
+
+    @pytest.mark.parametrize('action', ['transaction', 'comment', 'vote', 'update', 'owner'])
+    def test_revision_bumped(self, client: Client, fundraisers, rendered, action):
+        fundraiser = fundraisers[0]
+        client.force_login(fundraiser.owner)
+        client.get(reverse('fundraiser_detail', kwargs={'pk': fundraiser.id}))
+        if action == 'transaction':
+            client.post(
+                reverse('fundraiser_transaction_add', kwargs={'fundraiser_id': fundraiser.id}), {'amount': '100'}
+            )
+        elif action == 'comment':
+            client.post(reverse('fundraiser_comment_add', kwargs={'fundraiser_id': fundraiser.id}), {'message': 'Hi'})
+        elif action == 'vote':
+            client.post(reverse('fundraiser_vote', kwargs={'fundraiser_id': fundraiser.id}), {'vote': 'up'})
+        elif action == 'owner':
+            fundraiser.owner.last_name = 'Renamed'
+            fundraiser.owner.save()
+        else:
+            client.post(reverse('fundraiser_update', kwargs={'pk': fundraiser.id}), {
+                'name': 'Renamed',
+                'description': fundraiser.description,
+                'category': fundraiser.category.id,
+                'purpose': fundraiser.purpose,
+                'start_date': fundraiser.start_date,
+                'end_date': fundraiser.end_date,
+            })
+
+        revision = fundraiser.revision
+        fundraiser.refresh_from_db()
+        assert fundraiser.revision == revision + 1
+
+        rendered.clear()
+        response = client.get(reverse('fundraiser_detail', kwargs={'pk': fundraiser.id}))
+        assert rendered == [('detail_header', fundraiser.pk), ('detail_description', fundraiser.pk)]
+        if action == 'transaction':
+            assert '100' in response.context['header']
+        elif action in ('update', 'owner'):
+            assert 'Renamed' in response.context['header']
+
+    def test_warm_fragment_cache(self, client: Client, fundraisers, rendered):
+        call_command('warm_fragment_cache', chunk_size=3)
+        assert len(rendered) == 3 * len(fundraisers)
+
+        rendered.clear()
+        client.get(reverse('fundraiser_list'))
+        client.get(reverse('fundraiser_detail', kwargs={'pk': fundraisers[0].id}))
+        assert rendered == []
+
+
+@pytest.mark.django_db
+class TestApi:
+    def test_fundraiser_list(self, client: Client, users, categories):
+        fundraisers = _bulk_fundraisers(30, users[0], categories[0])
+        response = client.get(reverse('api_fundraiser_list'), {'limit': 20})
+        assert response.status_code == 200
+        data = response.json()
+        assert [row['id'] for row in data['results']] == [fundraiser.pk for fundraiser in fundraisers[:-21:-1]]
+        assert set(data['results'][0]) == {'id', 'name', 'purpose', 'collected', 'votes_positive', 'votes_negative'}
+        assert data['previous'] is None
+
+        data = client.get(reverse('api_fundraiser_list'), {'limit': 20, 'cursor': data['next']}).json()
+        assert [row['id'] for row in data['results']] == [fundraiser.pk for fundraiser in fundraisers[9::-1]]
+        assert data['next'] is None
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', 'WyJuZXh0IiwgWyJ4Il1d'])
+    def test_fundraiser_list_invalid_cursor(self, client: Client, cursor):
+        response = client.get(reverse('api_fundraiser_list'), {'cursor': cursor})
+        assert response.status_code == 400
+        assert response.json() == {'error': 'Invalid cursor.'}
+
+    def test_fields(self, client: Client, fundraisers):
+        response = client.get(reverse('api_fundraiser_detail', kwargs={'pk': fundraisers[0].id}), {
+            'fields': 'name,category,collected',
+        })
+        assert response.content.decode() == (
+            f'{{"name":"{fundraisers[0].name}","category":"{fundraisers[0].category.slug}","collected":"0.00"}}'
+        )
+
+        response = client.get(reverse('api_fundraiser_list'), {'fields': 'name,description'})
+        assert response.status_code == 400
+
+    def test_bulk(self, client: Client, fundraisers):
+        Transaction.objects.create(fundraiser=fundraisers[3], amount=25)
+        ids = [fundraisers[3].id, fundraisers[1].id, 999]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(reverse('api_fundraiser_bulk'), {'ids': ','.join(map(str, ids))})
+        assert len(context.captured_queries) == 1
+        assert response.json()['results'] == [
+            {'id': fundraisers[3].id, 'name': '3', 'purpose': 100, 'collected': '25.00',
+             'votes_positive': 0, 'votes_negative': 0},
+            {'id': fundraisers[1].id, 'name': '1', 'purpose': 100, 'collected': '0.00',
+             'votes_positive': 0, 'votes_negative': 0},
+        ]
+
+    @pytest.mark.parametrize('ids', ['', 'a,b', ','.join(map(str, range(1, 102)))])
+    def test_bulk_invalid(self, client: Client, ids):
+        response = client.get(reverse('api_fundraiser_bulk'), {'ids': ids})
+        assert response.status_code == 400
+        assert 'error' in response.json()
+
+    def test_progress(self, client: Client, fundraisers):
+        Transaction.objects.create(fundraiser=fundraisers[0], amount=25)
+        response = client.get(reverse('api_fundraiser_progress', kwargs={'pk': fundraisers[0].id}))
+        assert response.json() == {
+            'id': fundraisers[0].id, 'purpose': 100, 'collected': '25.00', 'transactions': 1,
+            'votes_positive': 0, 'votes_negative': 0,
+        }
+        assert client.get(reverse('api_fundraiser_progress', kwargs={'pk': 999})).status_code == 404
+
+    def test_categories(self, client: Client, fundraisers, categories):
+        response = client.get(reverse('api_category_list'))
+        assert response.json()['results'][0] == {'slug': categories[0].slug, 'name': categories[0].name, 'live_count': 1}
+
+
+@pytest.mark.django_db
+class TestImportDonations:
+    def test_import_csv(self, fundraisers, tmp_path):
+        path = tmp_path / 'donations.csv'
+        rows = ['fundraiser,amount,comment']
+        rows += [f'{fundraisers[i % 3].id},{i + 1}.50,Transfer {i}' for i in range(25)]
+        rows += ['999,10,Unknown fundraiser', f'{fundraisers[0].id},-5,Negative', 'abc,10,Invalid id']
+        path.write_text('\n'.join(rows) + '\n')
+        rejects = tmp_path / 'rejects.csv'
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('import_donations', str(path), chunk_size=10, rejects=str(rejects))
+        assert len([
+            query for query in context.captured_queries if query['sql'].startswith('UPDATE "fundraisers_fundraiser"')
+        ]) == 3
+
+        assert Transaction.objects.count() == 25
+        for fundraiser in fundraisers[:3]:
+            fundraiser.refresh_from_db()
+            assert fundraiser.collected == fundraiser.transaction_set.aggregate(Sum('amount'))['amount__sum']
+            assert fundraiser.transaction_count == fundraiser.transaction_set.count()
+        assert [line.split(',')[0] for line in rejects.read_text().splitlines()[1:]] == ['27', '28', '29']
+
+    def test_import_jsonl(self, fundraisers, tmp_path):
+        path = tmp_path / 'donations.jsonl'
+        path.write_text(
+            f'{{"fundraiser": {fundraisers[0].id}, "amount": "12.34", "comment": "Bank"}}\n'
+            f'{{"fundraiser": {fundraisers[0].id}, "amount": "1.234"}}\n'
+            'not json\n'
+        )
+        call_command('import_donations', str(path))
+
+        fundraisers[0].refresh_from_db()
+        assert (fundraisers[0].collected, fundraisers[0].transaction_count) == (Decimal('12.34'), 1)
+        assert Transaction.objects.get().comment == 'Bank'
+
+
+@pytest.mark.django_db
+class TestTransactionExport:
+    def test_not_my_fundraiser(self, client: Client, users, fundraisers):
+        client.force_login(users[0])
+        not_my_fundraiser = [fundraiser for fundraiser in fundraisers if fundraiser.owner != users[0]][0]
+        response = client.get(reverse('fundraiser_transaction_export', kwargs={'pk': not_my_fundraiser.id}))
+        assert response.status_code == 403
+        response = client.get(reverse('fundraiser_transaction_export', kwargs={'pk': 768}))
+        assert response.status_code == 404
+
+    def test_export(self, client: Client, users, fundraisers):
+        fundraiser = fundraisers[0]
+        Transaction.objects.create(fundraiser=fundraiser, user=users[1], amount=10, comment='=1+1')
+        Transaction.objects.create(fundraiser=fundraiser, amount=Decimal('2.50'), comment='Thanks, good luck')
+        Transaction.objects.create(fundraiser=fundraisers[1], amount=99)
+        client.force_login(fundraiser.owner)
+
+        response = client.get(reverse('fundraiser_transaction_export', kwargs={'pk': fundraiser.id}))
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        assert rows[0] == ['date', 'amount', 'donor', 'comment']
+        assert [row[1:] for row in rows[1:]] == [
+            ['10.00', users[1].get_full_name(), "'=1+1"],
+            ['2.50', 'Anonymous', 'Thanks, good luck'],
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncViews:
+    @staticmethod
+    def _get(view, path, **kwargs):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        response = async_to_sync(view.as_view())(request, **kwargs)
+        return response.render()
+
+    def test_list(self, fundraisers):
+        response = self._get(Fundraiser_views.AsyncList, reverse('fundraiser_list'))
+        assert response.status_code == 200
+        _asset_sorted(fundraisers, response.context_data['object_list'])
+        assert len(response.context_data['cards']) == len(fundraisers)
+
+    def test_category_list(self, fundraisers):
+        category = fundraisers[3].category
+        response = self._get(
+            Fundraiser_views.AsyncCategoryList, reverse('fundraiser_category_list', args=[category.slug]),
+            slug=category.slug,
+        )
+        assert [fundraiser.pk for fundraiser in response.context_data['object_list']] == [fundraisers[3].pk]
+        with pytest.raises(Http404):
+            self._get(Fundraiser_views.AsyncCategoryList, reverse('fundraiser_category_list', args=['x']), slug='x')
+
+    def test_detail(self, users, fundraisers):
+        fundraiser = fundraisers[0]
+        Transaction.objects.bulk_create(Transaction(fundraiser=fundraiser, user=users[1], amount=1) for i in range(25))
+        Comment.objects.create(fundraiser=fundraiser, user=users[1], message='Async comment')
+        response = self._get(
+            Fundraiser_views.AsyncDetail, reverse('fundraiser_detail', args=[fundraiser.pk]), pk=fundraiser.pk,
+        )
+        assert response.status_code == 200
+        assert response.context_data['object'] == fundraiser
+        assert len(response.context_data['transactions']) == 20
+        assert response.context_data['transactions'].has_next()
+        assert 'Async comment' in response.content.decode()
+        with pytest.raises(Http404):
+            self._get(Fundraiser_views.AsyncDetail, reverse('fundraiser_detail', args=[768]), pk=768)
+
+
+@pytest.mark.django_db
+class TestLiveUpdates:
+    @pytest.fixture(autouse=True)
+    def fast_polling(self, settings):
+        settings.LIVE_UPDATES_INTERVAL = 0.05
+        live.get_broadcaster.cache_clear()
+        yield
+        live.get_broadcaster.cache_clear()
+
+    def test_database_backend(self, fundraisers):
+        watched = [fundraisers[0].pk, fundraisers[1].pk]
+        Transaction.objects.create(fundraiser=fundraisers[0], amount=5, comment='Old donation')
+        backend = live.DatabaseBackend(0)
+        events = backend.poll(watched)
+        assert sorted((pk, event) for pk, event, data in events) == [(pk, 'progress') for pk in watched]
+        assert backend.poll(watched) == []
+
+        Transaction.objects.create(fundraiser=fundraisers[0], amount=10, comment='Live donation')
+        events = backend.poll(watched)
+        assert [(pk, event) for pk, event, data in events] == [(watched[0], 'progress'), (watched[0], 'donation')]
+        assert events[0][2]['collected'] == Decimal(15)
+        assert events[0][2]['transactions'] == 2
+        assert 'Live donation' in events[1][2]['html']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stream(self, fundraisers):
+        fundraiser_id = fundraisers[0].pk
+        messages = []
+
+        async def stream():
+            disconnected = asyncio.Event()
+            broadcaster = live.get_broadcaster()
+
+            async def receive():
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if message['type'] == 'http.response.start':
+                    return
+                if b'event: donation' in message['body']:
+                    disconnected.set()
+                elif not donated:
+                    # Donated once the stream is open, the next poll reports it.
+                    donated.append(True)
+                    await database_sync_to_async(Transaction.objects.create)(
+                        fundraiser_id=fundraiser_id, amount=10, comment='Live donation',
+                    )
+
+            donated = []
+            await asgi.application({'type': 'http', 'path': f'/fundraiser/{fundraiser_id}/live/'}, receive, send)
+            assert not broadcaster.subscribers
+
+        async_to_sync(stream)()
+        assert messages[0]['status'] == 200
+        assert (b'content-type', b'text/event-stream') in messages[0]['headers']
+        events = [message['body'].decode() for message in messages[1:]]
+        assert events[0].startswith('event: progress\n') and '"collected":"0.00"' in events[0]
+        assert events[1].startswith('event: progress\n') and '"collected":"10.00"' in events[1]
+        assert events[2].startswith('event: donation\n') and 'Live donation' in events[2]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stream_not_found(self):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(live.live_application)({'type': 'http'}, None, send, fundraiser_id=768)
+        assert messages[0]['status'] == 404
+
+    def test_wsgi_fallback(self, client: Client, fundraisers):
+        response = client.get(reverse('fundraiser_live', args=[fundraisers[0].pk]))
+        assert response.status_code == 204
+
+
+@pytest.mark.django_db
+class TestVoteBuffering:
+    @pytest.fixture(autouse=True)
+    def buffering(self, settings):
+        settings.VOTE_BUFFERING = True
+
+    def test_buffered_until_flush(self, client: Client, users, fundraisers, django_capture_on_commit_callbacks):
+        fundraiser = fundraisers[0]
+        with django_capture_on_commit_callbacks(execute=True):
+            for user in users[:3]:
+                assert fundraiser.vote('up', user=user)
+            assert fundraiser.vote('down', user=users[0])
+            assert fundraisers[1].vote('down', user=users[0])
+        fundraiser.refresh_from_db()
+        assert (fundraiser.votes_positive, fundraiser.votes_negative) == (0, 0)
+
+        response = client.get(reverse('fundraiser_detail', args=[fundraiser.pk]))
+        assert (response.context['object'].votes_positive, response.context['object'].votes_negative) == (2, 1)
+        response = client.get(reverse('api_fundraiser_progress', args=[fundraiser.pk]))
+        assert (response.json()['votes_positive'], response.json()['votes_negative']) == (2, 1)
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('flush_votes', stdout=StringIO())
+        assert len(context.captured_queries) == 1
+        for pk, expected in ((fundraiser.pk, (2, 1)), (fundraisers[1].pk, (0, 1))):
+            flushed = Fundraiser.objects.get(pk=pk)
+            assert (flushed.votes_positive, flushed.votes_negative) == expected
+        response = client.get(reverse('fundraiser_list'))
+        counts = {object.pk: (object.votes_positive, object.votes_negative) for object, card in response.context['cards']}
+        assert counts[fundraiser.pk] == (2, 1)
+
+        call_command('flush_votes', stdout=StringIO())
+        fundraiser.refresh_from_db()
+        assert (fundraiser.votes_positive, fundraiser.votes_negative) == (2, 1)
+
+    def test_votes_during_flush(self, fundraisers):
+        revision = fundraisers[0].revision
+        votes.add(fundraisers[0].pk, votes_positive=1)
+        deltas = votes.take()
+        # Registered again after the pending set was taken, left for the next flush.
+        votes.add(fundraisers[0].pk, votes_positive=1)
+        votes.add(fundraisers[1].pk, votes_negative=1)
+        Fundraiser.add_votes_many(deltas)
+        assert votes.take() == {fundraisers[0].pk: {'votes_positive': 1}, fundraisers[1].pk: {'votes_negative': 1}}
+        fundraisers[0].refresh_from_db()
+        assert fundraisers[0].votes_positive == 1
+        # Flushed votes bump the revision, so the live progress stream reports them.
+        assert fundraisers[0].revision == revision + 1
+        assert votes.take() == {}
+
+    def test_rolled_back_vote(self, users, fundraisers, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with db_transaction.atomic():
+                fundraisers[0].vote('up', user=users[0])
+                db_transaction.set_rollback(True)
+        assert not callbacks
+        assert votes.take() == {}
+
+
+@pytest.mark.django_db
+class TestDonationRollups:
+    @staticmethod
+    def _rollups():
+        return {
+            (row.fundraiser_id, row.day): (row.amount, row.count)
+            for row in DonationRollup.objects.all() if row.count
+        }
+
+    @staticmethod
+    def _expected():
+        expected = {}
+        for transaction in Transaction.objects.all():
+            key = (transaction.fundraiser_id, timezone.localdate(transaction.created_at))
+            amount, count = expected.get(key, (Decimal(0), 0))
+            expected[key] = (amount + transaction.amount, count + 1)
+        return expected
+
+    def test_incremental(self, fundraisers, tmp_path):
+        first = Transaction.objects.create(fundraiser=fundraisers[0], amount=10)
+        Transaction.objects.create(fundraiser=fundraisers[0], amount=5)
+        last = Transaction.objects.create(fundraiser=fundraisers[1], amount=7)
+        Transaction.objects.filter(pk=last.pk).update(created_at=last.created_at - timedelta(days=3))
+        assert self._rollups() != self._expected()
+        call_command('rebuild_donation_rollups', workers=1, chunk_size=3, stdout=StringIO())
+        assert self._rollups() == self._expected()
+
+        first.fundraiser = fundraisers[2]
+        first.amount = 12
+        first.save()
+        Transaction.objects.get(pk=last.pk).delete()
+        path = tmp_path / 'donations.csv'
+        path.write_text(f'fundraiser,amount\n{fundraisers[0].id},3\n{fundraisers[2].id},4\n')
+        call_command('import_donations', str(path), stdout=StringIO())
+        assert self._rollups() == self._expected()
+        Transaction.objects.filter(fundraiser=fundraisers[0]).delete()
+        assert self._rollups() == self._expected()
+
+    def test_history(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        Fundraiser.objects.filter(pk=fundraiser.pk).update(
+            start_date=fundraiser.start_date - timedelta(days=99), end_date=fundraiser.start_date,
+        )
+        today = timezone.localdate()
+        for days, amount in ((99, 10), (98, 5), (0, 1)):
+            DonationRollup.objects.create(fundraiser=fundraiser, day=today - timedelta(days=days), amount=amount, count=1)
+
+        response = client.get(reverse('api_fundraiser_history', args=[fundraiser.pk]), {'points': 30})
+        data = response.json()
+        assert data['interval_days'] == 4
+        assert len(data['results']) == 25
+        assert data['results'][0] == {
+            'date': str(today - timedelta(days=99)), 'amount': '15.00', 'count': 2, 'collected': '15.00',
+        }
+        assert data['results'][-1]['collected'] == '16.00'
+
+        response = client.get(reverse('api_fundraiser_history', args=[fundraiser.pk]), {'points': 1000})
+        assert response.status_code == 400
+        response = client.get(reverse('api_fundraiser_history', args=[768]))
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestSearch:
+    def test_search(self, client: Client, fundraisers):
+        fundraisers[0].name = 'Zbiórka na schronisko'
+        fundraisers[0].description = '<p>Karma dla&nbsp;psów</p><p>i kotów</p>'
+        fundraisers[0].save()
+        fundraisers[1].description = '<p>Leczenie psów i kotów ze schroniska</p>'
+        fundraisers[1].save()
+        fundraisers[2].name = 'Psy'
+        fundraisers[2].save()
+        assert Fundraiser.objects.get(pk=fundraisers[0].pk).description_text == 'Karma dla psów i kotów'
+
+        response = client.get(reverse('fundraiser_search'), {'q': 'psów kotów'})
+        assert {object.pk for object, card in response.context['cards']} == {fundraisers[0].pk, fundraisers[1].pk}
+        if connection.vendor == 'sqlite':
+            # Only the FTS5 tokenizer removes diacritics.
+            response = client.get(reverse('fundraiser_search'), {'q': 'zbiorka'})
+            assert [object.pk for object, card in response.context['cards']] == [fundraisers[0].pk]
+        response = client.get(reverse('fundraiser_search'), {'q': '"unbalanced OR NOT'})
+        assert response.status_code == 200
+        response = client.get(reverse('fundraiser_search'))
+        assert response.context['cards'] == []
+
+        Fundraiser.objects.get(pk=fundraisers[0].pk).delete()
+        response = client.get(reverse('fundraiser_search'), {'q': 'kotów'})
+        assert [object.pk for object, card in response.context['cards']] == [fundraisers[1].pk]
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='Only SQLite drops the triggers with the table.')
+    def test_sqlite_triggers_restored_after_migrate(self, fundraisers):
+        assert not search_index.restore_sqlite_triggers()
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER fundraisers_fundraiser_fts_update')
+        Fundraiser.objects.filter(pk=fundraisers[0].pk).update(name='Schronisko')
+        assert not Fundraiser.objects.search('schronisko').exists()
+
+        emit_post_migrate_signal(0, False, 'default')
+        assert [fundraiser.pk for fundraiser in Fundraiser.objects.search('schronisko')] == [fundraisers[0].pk]
+        Fundraiser.objects.filter(pk=fundraisers[1].pk).update(name='Schronisko')
+        assert Fundraiser.objects.search('schronisko').count() == 2
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='The search vector only exists on PostgreSQL.')
+    def test_postgresql_search_vector(self, fundraisers):
+        fundraisers[0].name = 'Schronisko'
+        fundraisers[0].save()
+        fundraisers[1].description = '<p>Karma dla <b>schronisko</b></p>'
+        fundraisers[1].save()
+
+        def vector(pk):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT search_vector::text FROM fundraisers_fundraiser WHERE id = %s', [pk])
+                return cursor.fetchone()[0]
+
+        assert "'schronisko':1A" in vector(fundraisers[0].pk)
+        assert vector(fundraisers[1].pk) == "'1':1A 'dla':3B 'karma':2B 'schronisko':4B"
+        # Name matches weigh more than description matches.
+        found = Fundraiser.objects.search('schronisko').order_by('-rank')
+        assert [fundraiser.pk for fundraiser in found] == [fundraisers[0].pk, fundraisers[1].pk]
+        assert not Fundraiser.objects.search('schronisko -karma').filter(pk=fundraisers[1].pk).exists()
+
+        Fundraiser.add_to_totals(fundraisers[1].pk, 10, 1)
+        assert vector(fundraisers[1].pk) == "'1':1A 'dla':3B 'karma':2B 'schronisko':4B"
+        Fundraiser.objects.filter(pk=fundraisers[1].pk).update(name='Psy')
+        assert vector(fundraisers[1].pk) == "'dla':3B 'karma':2B 'psy':1A 'schronisko':4B"
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='The search vector only exists on PostgreSQL.')
+    def test_postgresql_ranked_pagination(self, users, categories):
+        fundraisers = _bulk_fundraisers(30, users[0], categories[0])
+        for fundraiser in fundraisers[:25]:
+            # Five groups of tied ranks.
+            fundraiser.description = 'schronisko ' * (fundraiser.pk % 5 + 1)
+            fundraiser.save()
+
+        paginator = KeysetPaginator(Fundraiser.objects.search('schronisko'), 7, '-rank')
+        page = paginator.page()
+        found = [fundraiser.pk for fundraiser in page]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            found += [fundraiser.pk for fundraiser in page]
+        assert sorted(found) == sorted(fundraiser.pk for fundraiser in fundraisers[:25])
+
+    def test_ranked_pagination(self, client: Client, users, categories):
+        fundraisers = _bulk_fundraisers(30, users[0], categories[0])
+        for fundraiser in fundraisers[:25]:
+            fundraiser.description = 'schronisko ' * (fundraiser.pk % 4 + 1)
+            fundraiser.save()
+
+        response = client.get(reverse('fundraiser_search'), {'q': 'schronisko'})
+        found = [object.pk for object, card in response.context['cards']]
+        page = response.context['page_obj']
+        response = client.get(reverse('fundraiser_search'), {'q': 'schronisko', 'cursor': page.next_cursor})
+        found += [object.pk for object, card in response.context['cards']]
+        assert sorted(found) == sorted(fundraiser.pk for fundraiser in fundraisers[:25])
+        ranks = {fundraiser.pk: fundraiser.rank for fundraiser in Fundraiser.objects.search('schronisko')}
+        assert [ranks[pk] for pk in found] == sorted(ranks.values(), reverse=True)
+        assert len(set(ranks.values())) > 1
+        assert 'q=schronisko&amp;cursor=' in response.content.decode()
+
+
+@pytest.mark.django_db
+class TestSortedLists:
+    @staticmethod
+    def _pages(client, sort):
+        found = []
+        response = client.get(reverse('fundraiser_list'), {'sort': sort})
+        while True:
+            page = response.context['page_obj']
+            found += [fundraiser.pk for fundraiser in page]
+            if not page.has_next():
+                return found
+            assert f'sort={sort}&amp;cursor=' in response.content.decode()
+            response = client.get(reverse('fundraiser_list'), {'sort': sort, 'cursor': page.next_cursor})
+
+    def test_nearly_funded(self, client: Client, users, categories):
+        fundraisers = _bulk_fundraisers(30, users[0], categories[0])
+        Fundraiser.add_to_totals_many({fundraiser.pk: (i, 1) for i, fundraiser in enumerate(fundraisers)})
+        Transaction.objects.create(fundraiser=fundraisers[0], amount=Decimal('50.5'))
+        Transaction.objects.create(fundraiser=fundraisers[1], amount=90)
+        Transaction.objects.create(fundraiser=fundraisers[4], amount=100)
+        fundraiser = Fundraiser.objects.get(pk=fundraisers[2].pk)
+        fundraiser.purpose = 4
+        fundraiser.save()
+
+        ratios = dict(Fundraiser.objects.values_list('pk', 'funded_ratio'))
+        assert ratios[fundraisers[0].pk] == 0.505
+        assert ratios[fundraisers[1].pk] == 0.91
+        assert ratios[fundraisers[2].pk] == 0.5
+        assert ratios[fundraisers[3].pk] == 0.03
+        assert ratios[fundraisers[4].pk] == 1.04
+        expected = sorted(
+            (pk for pk, ratio in ratios.items() if ratio < 1), key=lambda pk: (ratios[pk], pk), reverse=True,
+        )
+        assert self._pages(client, 'nearly_funded') == expected
+        assert expected[:3] == [fundraisers[1].pk, fundraisers[0].pk, fundraisers[2].pk]
+
+    def test_trending(self, client: Client, users, categories):
+        fundraisers = _bulk_fundraisers(30, users[0], categories[0])
+        today = timezone.localdate()
+        DonationRollup.objects.bulk_create([
+            DonationRollup(fundraiser=fundraisers[0], day=today, amount=10, count=4),
+            DonationRollup(fundraiser=fundraisers[1], day=today - timedelta(days=2), amount=10, count=4),
+            DonationRollup(fundraiser=fundraisers[2], day=today - timedelta(days=30), amount=10, count=40),
+        ])
+        Fundraiser.objects.filter(pk=fundraisers[3].pk).update(votes_positive=15)
+
+        call_command('refresh_trending', batch_size=7, stdout=StringIO())
+        scores = dict(Fundraiser.objects.values_list('pk', 'trending'))
+        assert scores[fundraisers[0].pk] == 4
+        assert scores[fundraisers[1].pk] == 2
+        assert scores[fundraisers[2].pk] == 0
+        assert scores[fundraisers[3].pk] == 1.5
+        found = self._pages(client, 'trending')
+        assert found[:3] == [fundraisers[0].pk, fundraisers[1].pk, fundraisers[3].pk]
+        assert sorted(found) == sorted(fundraiser.pk for fundraiser in fundraisers)
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('refresh_trending', stdout=StringIO())
+        assert not any(query['sql'].startswith('UPDATE') for query in context.captured_queries)
+
+    def test_unknown_sort(self, client: Client, fundraisers):
+        response = client.get(reverse('fundraiser_list'), {'sort': 'collected'})
+        assert response.context['sort'] == 'newest'
+
+
+@pytest.mark.django_db
+class TestBenchmarks:
+    def test_seed_data(self):
+        call_command(
+            'seed_data', users=5, categories=2, fundraisers=30, transactions=600, comments=90, static_pages=2,
+            batch_size=7, seed=1, stdout=StringIO(),
+        )
+        assert Fundraiser.objects.count() == 30
+        assert Transaction.objects.count() > 0
+        assert Comment.objects.count() > 0
+        call_command('recompute_totals', '--check', stdout=StringIO())
+        for fundraiser in Fundraiser.objects.all():
+            assert fundraiser.funded_ratio == pytest.approx(float(fundraiser.collected) / fundraiser.purpose)
+            assert fundraiser.description_text
+        first = Transaction.objects.order_by('created_at').first()
+        assert first.created_at >= first.fundraiser.start_date
+        assert first.created_at < timezone.now() - timedelta(days=1)
+        assert not Fundraiser.objects.filter(created_at__gte=F('start_date')).exists()
+        assert Comment._meta.get_field('created_at').auto_now_add and Comment._meta.get_field('updated_at').auto_now
+        assert DonationRollup.objects.aggregate(count=Sum('count'))['count'] == Transaction.objects.count()
+
+    def test_benchmark_urls(self, tmp_path):
+        call_command(
+            'seed_data', users=3, categories=2, fundraisers=10, transactions=100, comments=50, static_pages=1,
+            seed=2, stdout=StringIO(),
+        )
+        Fundraiser.objects.update(active=True, start_date=timezone.now() - timedelta(days=1))
+        path = tmp_path / 'results.json'
+        call_command(
+            'benchmark_urls', iterations=2, warmup=0, host='testserver', output=str(path), stdout=StringIO(),
+        )
+        results = json.loads(path.read_text())['results']
+        assert {result['url_name'] for result in results.values()} == benchmark_urls.Command.url_names()
+        assert all(result['status'] < 400 for result in results.values())
+        assert results['fundraiser_list']['queries'] >= 1
+        assert not User.objects.filter(username=benchmark_urls.BENCHMARK_USERNAME).exists()
+
+        out = StringIO()
+        call_command('benchmark_urls', iterations=1, warmup=0, host='testserver', compare=str(path), stdout=out)
+        assert 'fundraiser_detail: p50' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    def test_merge_profiles(self, tmp_path):
+        (tmp_path / 'fundraiser_list').mkdir()
+        (tmp_path / 'fundraiser_list' / '1.collapsed').write_text('main;view;render 6\nmain;view;query 2\n')
+        (tmp_path / 'fundraiser_detail').mkdir()
+        (tmp_path / 'fundraiser_detail' / '2.collapsed').write_text('main;view;query 2\n')
+        out = StringIO()
+        merged = tmp_path / 'merged.collapsed'
+        call_command('merge_profiles', str(tmp_path), output=str(merged), stdout=out)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == 'Merged 2 profiles, 10 samples.'
+        assert lines[2].split() == ['60.0', '60.0', 'render']
+        assert lines[3].split() == ['40.0', '40.0', 'query']
+        assert merged.read_text() == 'main;view;render 6\nmain;view;query 4\n'
+
+        out = StringIO()
+        call_command('merge_profiles', str(tmp_path), url_names=['fundraiser_detail'], stdout=out)
+        assert out.getvalue().startswith('Merged 1 profiles, 2 samples.')
+
+
+@pytest.mark.django_db
+class TestRenderedDescription:
+    def test_views(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        fundraiser.description = '<p>Safe <em>text</em></p><script>alert(1)</script>'
+        fundraiser.save()
+
+        response = client.get(reverse('fundraiser_detail', args=[fundraiser.pk]))
+        assert '<p>Safe <em>text</em></p>' in response.content.decode()
+        assert 'alert(1)' not in response.content.decode()
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(reverse('fundraiser_list'))
+        assert 'Safe text' in response.content.decode()
+        assert not any('"description_html"' in query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestFormCache:
+    @staticmethod
+    def _csrf_tokens(response):
+        return re.findall(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode())
+
+    def test_detail_forms(self, fundraisers, monkeypatch):
+        fundraiser = fundraisers[0]
+        rendered = []
+        render = form_cache.render_crispy_form
+        monkeypatch.setattr(form_cache, 'render_crispy_form', lambda form, **kwargs: rendered.append(form) or render(
+            form, **kwargs
+        ))
+
+        for _ in range(2):
+            client = Client(enforce_csrf_checks=True)
+            response = client.get(reverse('fundraiser_detail', args=[fundraiser.pk]))
+            content = response.content.decode()
+            assert reverse('fundraiser_comment_add', args=[fundraiser.pk]) in content
+            assert reverse('fundraiser_transaction_add', args=[fundraiser.pk]) in content
+            assert form_cache.CSRF_PLACEHOLDER not in content
+            # The vote forms, then the transaction and comment forms.
+            token = self._csrf_tokens(response)[-1]
+            response = client.post(reverse('fundraiser_comment_add', args=[fundraiser.pk]), {
+                'message': 'Cached', 'csrfmiddlewaretoken': token,
+            })
+            assert response.status_code == 302
+        assert [type(form) for form in rendered] == [TransactionForm, CommentAddForm]
+        assert fundraiser.comment_set.filter(message='Cached').count() == 2
+
+        client.get(reverse('fundraiser_detail', args=[fundraisers[1].pk]))
+        assert len(rendered) == 4
+
+    def test_update_form(self, client: Client, fundraisers):
+        fundraiser = fundraisers[0]
+        client.force_login(fundraiser.owner)
+        url = reverse('fundraiser_update', args=[fundraiser.pk])
+        assert 'value="0"' in client.get(url).content.decode()
+
+        fundraiser.name = 'Renamed'
+        fundraiser.save()
+        Category.objects.create(name='New category')
+        content = client.get(url).content.decode()
+        assert 'value="Renamed"' in content
+        assert 'New category' in content
+
+        # Bound forms with errors are not cached.
+        response = client.post(url, {'name': ''})
+        assert 'name' in response.context['form'].errors
+        assert 'is-invalid' in response.content.decode()
+
+
+@pytest.mark.django_db
+class TestThrottling:
+    def test_comments(self, client: Client, fundraisers, settings):
+        settings.THROTTLE_RATES = {'comment': (2, 60)}
+        fundraiser = fundraisers[0]
+        url = reverse('fundraiser_comment_add', args=[fundraiser.pk])
+        for _ in range(2):
+            assert client.post(url, {'message': 'Hello'}).status_code == 302
+        response = client.post(url, {'message': 'Hello'})
+        assert response.status_code == 429
+        assert response['Retry-After'] == '30'
+        assert fundraiser.comment_set.count() == 2
+
+        # Signing in does not escape the address's bucket, other scopes are not affected.
+        client.force_login(fundraiser.owner)
+        assert client.post(url, {'message': 'Hello'}).status_code == 429
+        assert client.post(reverse('fundraiser_vote', args=[fundraiser.pk]), {'vote': 'up'}).status_code == 302
+
+    def test_buckets(self, settings):
+        # Runs the Lua script when the tests are configured with RedisCache.
+        settings.THROTTLE_RATES = {'vote': (2, 10)}
+        assert throttling.take_token('vote', ['ip:1'], now=100) is None
+        assert throttling.take_token('vote', ['ip:1'], now=100) is None
+        # Half a token refilled, the other half takes 2.5 seconds.
+        assert throttling.take_token('vote', ['ip:1'], now=102.5) == 3
+        assert throttling.take_token('vote', ['ip:2'], now=102.5) is None
+        assert throttling.take_token('vote', ['ip:1'], now=105) is None
+        # A new session on the same address waits for the address's bucket, without using its own.
+        assert throttling.take_token('vote', ['ip:1', 'session:new'], now=105) == 5
+        assert throttling.take_token('vote', ['session:new'], now=105) is None
+        assert throttling.take_token('vote', ['session:new'], now=105) is None
+        assert throttling.take_token('vote', ['session:new'], now=105) == 5
@@ -0,0 +1,112 @@
+"""
+Token-bucket throttling of the POST endpoints, configured per scope in THROTTLE_RATES as (requests, seconds).
+
+A bucket holds up to ``requests`` tokens and refills continuously, ``requests`` every ``seconds``. A client
+has one bucket per IP address, one per session when it has one and one per user when signed in. A request
+takes a token from each of them and is refused while any is empty, so dropping the session or signing out
+does not escape the IP address's bucket. Behind a proxy REMOTE_ADDR must be the client's address.
+
+With RedisCache all buckets of a request are read and updated by one Lua script, a single round trip that
+is atomic across workers. Other backends keep the buckets through the cache API under a process lock,
+which is only atomic for LocMemCache, a per-process cache anyway.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+
+# Returns the seconds until every bucket has a token again, 0 when one was taken from each.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local bucket = redis.call('HMGET', key, 'tokens', 'at')
+    local at = tonumber(bucket[2]) or now
+    tokens[i] = math.min(capacity, (tonumber(bucket[1]) or capacity) + math.max(now - at, 0) * rate)
+    if tokens[i] < 1 then
+        wait = math.max(wait, (1 - tokens[i]) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    if wait == 0 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens[i]), 'at', tostring(now))
+    redis.call('EXPIRE', key, ttl)
+end
+return tostring(wait)
+"""
+
+_lock = threading.Lock()
+_script = None
+
+
+def client_keys(request):
+    keys = [f'ip:{request.META.get("REMOTE_ADDR", "")}']
+    session_key = request.session.session_key
+    if session_key:
+        keys.append(f'session:{session_key}')
+    if request.user.is_authenticated:
+        keys.append(f'user:{request.user.pk}')
+    return keys
+
+
+def _take_redis(cache, keys, capacity, rate, now, ttl):
+    global _script
+    keys = [cache.make_key(key) for key in keys]
+    client = cache._cache.get_client(keys[0], write=True)
+    if _script is None:
+        _script = client.register_script(TAKE_SCRIPT)
+    return float(_script(keys=keys, args=[capacity, rate, now, ttl], client=client))
+
+
+def _take_locally(cache, keys, capacity, rate, now, ttl):
+    with _lock:
+        buckets = cache.get_many(keys)
+        tokens = {}
+        wait = 0
+        for key in keys:
+            stored, at = buckets.get(key, (capacity, now))
+            tokens[key] = min(capacity, stored + max(now - at, 0) * rate)
+            if tokens[key] < 1:
+                wait = max(wait, (1 - tokens[key]) / rate)
+        cache.set_many({key: (value - (0 if wait else 1), now) for key, value in tokens.items()}, ttl)
+    return wait
+
+
+def take_token(scope, clients, now=None):
+    """Takes a token from every bucket of the clients, returns the seconds to wait when one is empty, else None."""
+    rate = settings.THROTTLE_RATES.get(scope)
+    if rate is None:
+        return None
+    capacity, period = rate
+    now = time.time() if now is None else now
+    keys = [f'fundraisers:throttle:{scope}:{client}' for client in clients]
+    # Buckets left alone until they are full again are dropped.
+    ttl = math.ceil(period) + 1
+    cache = caches['default']
+    take = _take_redis if isinstance(cache, RedisCache) else _take_locally
+    wait = take(cache, keys, capacity, capacity / period, now, ttl)
+    return max(math.ceil(wait), 1) if wait else None
+
+
+class ThrottleMixin:
+    throttle_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            retry_after = take_token(self.throttle_scope, client_keys(request))
+            if retry_after is not None:
+                response = HttpResponse(_('Too many requests, try again later.'), status=429)
+                response['Retry-After'] = retry_after
+                return response
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,62 @@
+"""
+Trending scores of the live fundraisers, refreshed periodically by ``manage.py refresh_trending``.
+
+A fundraiser's score is its recent donation velocity, the donations of the last WINDOW_DAYS days from
+the daily rollups with each day's weight halving every HALF_LIFE_DAYS, plus its net votes times
+VOTE_WEIGHT. Only rows whose score changed are written, so the list pages can sort on the stored column.
+"""
+from datetime import timedelta
+
+from django.db.models import Case, FloatField, Value, When
+from django.utils import timezone
+
+from fundraisers.models import DonationRollup, Fundraiser
+
+WINDOW_DAYS = 7
+HALF_LIFE_DAYS = 2
+VOTE_WEIGHT = 0.1
+
+
+def donation_velocity(today):
+    """Decayed donation counts of the last WINDOW_DAYS days as {fundraiser_id: velocity}."""
+    velocity = {}
+    rollups = DonationRollup.objects.filter(
+        day__gt=today - timedelta(days=WINDOW_DAYS), day__lte=today, count__gt=0,
+    ).values_list('fundraiser_id', 'day', 'count')
+    for fundraiser_id, day, count in rollups.iterator():
+        weight = 0.5 ** ((today - day).days / HALF_LIFE_DAYS)
+        velocity[fundraiser_id] = velocity.get(fundraiser_id, 0) + count * weight
+    return velocity
+
+
+def score(velocity, votes_positive, votes_negative):
+    return round(velocity + (votes_positive - votes_negative) * VOTE_WEIGHT, 6)
+
+
+def refresh(batch_size=1000):
+    """Updates the stored scores of all live fundraisers and returns how many changed."""
+    velocity = donation_velocity(timezone.localdate())
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(Fundraiser.objects.live().filter(pk__gt=last_pk).order_by('pk').values_list(
+            'pk', 'trending', 'votes_positive', 'votes_negative',
+        )[:batch_size])
+        if not rows:
+            return updated
+        last_pk = rows[-1][0]
+        changed = {}
+        for pk, trending, votes_positive, votes_negative in rows:
+            new = score(velocity.get(pk, 0), votes_positive, votes_negative)
+            if new != trending:
+                changed[pk] = new
+        updated += _write(changed)
+
+
+def _write(scores):
+    if not scores:
+        return 0
+    # Not shown on any page, so the revision and the cached fragments stay as they are.
+    return Fundraiser.objects.filter(pk__in=scores).update(trending=Case(
+        *(When(pk=pk, then=Value(value)) for pk, value in scores.items()), output_field=FloatField(),
+    ))
@@ -1,16 +1,32 @@
+from django.conf import settings
 from django.urls import path
 
-from fundraisers.views import Fundraiser, Comment, Transaction
+from fundraisers.views import Fundraiser, Comment, Transaction, Api
 
+if settings.ASYNC_VIEWS:
+    List, CategoryList, Detail = Fundraiser.AsyncList, Fundraiser.AsyncCategoryList, Fundraiser.AsyncDetail
+else:
+    List, CategoryList, Detail = Fundraiser.List, Fundraiser.CategoryList, Fundraiser.Detail
 
 urlpatterns = [
-    path('', Fundraiser.List.as_view(), name='fundraiser_list'),
+    path('', List.as_view(), name='fundraiser_list'),
     path('my-list/', Fundraiser.MyList.as_view(), name='fundraiser_my_list'),
-    path('category/<slug:slug>/', Fundraiser.CategoryList.as_view(), name='fundraiser_category_list'),
-    path('<int:pk>/', Fundraiser.Detail.as_view(), name='fundraiser_detail'),
+    path('search/', Fundraiser.Search.as_view(), name='fundraiser_search'),
+    path('category/<slug:slug>/', CategoryList.as_view(), name='fundraiser_category_list'),
+    path('<int:pk>/', Detail.as_view(), name='fundraiser_detail'),
     path('create/', Fundraiser.Create.as_view(), name='fundraiser_create'),
     path('update/<int:pk>/', Fundraiser.Update.as_view(), name='fundraiser_update'),
+    path('update/<int:pk>/export/', Transaction.Export.as_view(), name='fundraiser_transaction_export'),
     path('<int:fundraiser_id>/comment/add/', Comment.Add.as_view(), name='fundraiser_comment_add'),
+    path('<int:fundraiser_id>/comments/', Comment.List.as_view(), name='fundraiser_comment_list'),
+    path('<int:fundraiser_id>/live/', Fundraiser.Live.as_view(), name='fundraiser_live'),
     path('<int:fundraiser_id>/vote/', Fundraiser.Vote.as_view(), name='fundraiser_vote'),
     path('<int:fundraiser_id>/transaction/add/', Transaction.Add.as_view(), name='fundraiser_transaction_add'),
+    path('<int:fundraiser_id>/transactions/', Transaction.List.as_view(), name='fundraiser_transaction_list'),
+    path('api/fundraisers/', Api.FundraiserList.as_view(), name='api_fundraiser_list'),
+    path('api/fundraisers/bulk/', Api.FundraiserBulk.as_view(), name='api_fundraiser_bulk'),
+    path('api/fundraisers/<int:pk>/', Api.FundraiserDetail.as_view(), name='api_fundraiser_detail'),
+    path('api/fundraisers/<int:pk>/progress/', Api.Progress.as_view(), name='api_fundraiser_progress'),
+    path('api/fundraisers/<int:pk>/history/', Api.History.as_view(), name='api_fundraiser_history'),
+    path('api/categories/', Api.CategoryList.as_view(), name='api_category_list'),
 ]
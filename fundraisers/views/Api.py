@@ -0,0 +1,168 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+
+from fundraisers.context_processors import nav_categories
+from fundraisers.models import DonationRollup, Fundraiser
+from fundraisers.pagination import InvalidCursor, KeysetPaginator
+from fundraisers.votes import apply_pending
+
+FIELDS = {
+    'id': 'pk',
+    'name': 'name',
+    'slug': 'slug',
+    'category': 'category__slug',
+    'purpose': 'purpose',
+    'collected': 'collected',
+    'transactions': 'transaction_count',
+    'votes_positive': 'votes_positive',
+    'votes_negative': 'votes_negative',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+}
+DEFAULT_FIELDS = ('id', 'name', 'purpose', 'collected', 'votes_positive', 'votes_negative')
+MAX_LIMIT = 100
+MAX_HISTORY_POINTS = 365
+
+
+class ApiError(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder, json_dumps_params={'separators': (',', ':')},
+    )
+
+
+class ApiView(View):
+    http_method_names = ['get', 'head', 'options']
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except (ApiError, InvalidCursor) as error:
+            return json_response({'error': str(error)}, status=400)
+        except Fundraiser.DoesNotExist:
+            return json_response({'error': 'Not found.'}, status=404)
+
+    def get_fields(self):
+        fields = self.request.GET.get('fields')
+        if not fields:
+            return DEFAULT_FIELDS
+        fields = tuple(dict.fromkeys(fields.split(',')))
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise ApiError(f'Unknown fields: {", ".join(unknown)}.')
+        return fields
+
+    def get_queryset(self, fields):
+        queryset = Fundraiser.objects.only(*(FIELDS[field] for field in fields if field != 'id'))
+        if 'category' in fields:
+            queryset = queryset.select_related('category')
+        return queryset
+
+    def serialize_many(self, fundraisers, fields):
+        if 'votes_positive' in fields or 'votes_negative' in fields:
+            apply_pending(fundraisers)
+        return [self.serialize(fundraiser, fields) for fundraiser in fundraisers]
+
+    @staticmethod
+    def serialize(fundraiser, fields):
+        data = {}
+        for field in fields:
+            value = fundraiser
+            for attribute in FIELDS[field].split('__'):
+                value = getattr(value, attribute)
+            data[field] = value
+        return data
+
+    @staticmethod
+    def get_int(value, name, maximum=None):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ApiError(f'{name} must be an integer.')
+        if value < 1 or (maximum and value > maximum):
+            raise ApiError(f'{name} must be between 1 and {maximum}.' if maximum else f'{name} must be positive.')
+        return value
+
+
+class FundraiserList(ApiView):
+    def get(self, request):
+        fields = self.get_fields()
+        limit = self.get_int(request.GET.get('limit', 20), 'limit', MAX_LIMIT)
+        page = KeysetPaginator(self.get_queryset(fields).live(), limit).page(request.GET.get('cursor'))
+        return json_response({
+            'results': self.serialize_many(page.object_list, fields),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+
+class FundraiserBulk(ApiView):
+    def get(self, request):
+        fields = self.get_fields()
+        ids = [self.get_int(pk, 'ids') for pk in request.GET.get('ids', '').split(',') if pk]
+        if not ids or len(ids) > MAX_LIMIT:
+            raise ApiError(f'ids must list between 1 and {MAX_LIMIT} fundraiser ids.')
+        fundraisers = self.get_queryset(fields).in_bulk(ids)
+        return json_response({
+            'results': self.serialize_many([fundraisers[pk] for pk in dict.fromkeys(ids) if pk in fundraisers], fields),
+        })
+
+
+class FundraiserDetail(ApiView):
+    def get(self, request, pk):
+        fields = self.get_fields()
+        return json_response(self.serialize_many([self.get_queryset(fields).get(pk=pk)], fields)[0])
+
+
+class Progress(ApiView):
+    fields = ('id', 'purpose', 'collected', 'transactions', 'votes_positive', 'votes_negative')
+
+    def get(self, request, pk):
+        return json_response(self.serialize_many([self.get_queryset(self.fields).get(pk=pk)], self.fields)[0])
+
+
+class History(ApiView):
+    def get(self, request, pk):
+        points = self.get_int(request.GET.get('points', 60), 'points', MAX_HISTORY_POINTS)
+        fundraiser = Fundraiser.objects.only('start_date', 'end_date').get(pk=pk)
+        days = list(
+            DonationRollup.objects.filter(fundraiser_id=pk).order_by('day').values_list('day', 'amount', 'count')
+        )
+
+        first = timezone.localdate(fundraiser.start_date)
+        last = min(timezone.localdate(fundraiser.end_date), timezone.localdate())
+        if days:
+            first, last = min(first, days[0][0]), max(last, days[-1][0])
+        length = max((last - first).days + 1, 1)
+        # Consecutive days are merged into equal buckets, so long campaigns still return at most `points`.
+        interval = -(-length // points)
+        buckets = [[Decimal(0), 0] for _ in range(-(-length // interval))]
+        for day, amount, count in days:
+            bucket = buckets[(day - first).days // interval]
+            bucket[0] += amount
+            bucket[1] += count
+
+        results = []
+        collected = Decimal(0)
+        for index, (amount, count) in enumerate(buckets):
+            collected += amount
+            results.append({
+                'date': first + timedelta(days=index * interval),
+                'amount': amount,
+                'count': count,
+                'collected': collected,
+            })
+        return json_response({'interval_days': interval, 'results': results})
+
+
+class CategoryList(ApiView):
+    def get(self, request):
+        return json_response({'results': nav_categories()})
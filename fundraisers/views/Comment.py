@@ -1,11 +1,17 @@
+from django.http import HttpResponse
 from django.shortcuts import redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.views import View
 
 from fundraisers.forms import CommentAddForm
 from fundraisers.models import Fundraiser
+from fundraisers.pagination import feed_page
+from fundraisers.throttling import ThrottleMixin
 
 
-class Add(View):
+class Add(ThrottleMixin, View):
+    throttle_scope = 'comment'
+
     def post(self, request, fundraiser_id):
         fundraiser = get_object_or_404(Fundraiser, pk=fundraiser_id)
         form = CommentAddForm(request.POST, fundraiser=fundraiser)
@@ -15,3 +21,13 @@ class Add(View):
             comment.user = None if request.user.is_anonymous else request.user
             comment.save()
         return redirect('fundraiser_detail', pk=fundraiser_id)
+
+
+class List(View):
+    def get(self, request, fundraiser_id):
+        fundraiser = get_object_or_404(Fundraiser.objects.only('pk'), pk=fundraiser_id)
+        context = {
+            'fundraiser_id': fundraiser.pk,
+            'comments': feed_page(fundraiser.comment_set.all(), request.GET.get('cursor')),
+        }
+        return HttpResponse(render_to_string('fundraiser/comment_list.html', context))
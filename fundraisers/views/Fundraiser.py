@@ -1,30 +1,74 @@
-from datetime import datetime
+import asyncio
 
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import Http404, HttpResponse
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
-from django.utils.timezone import make_aware
+from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 
 from fundraisers.forms import FundraiserForm, CommentAddForm, TransactionForm
-from fundraisers.models import Fundraiser, Category
+from fundraisers.fragments import render_fragments
+from fundraisers.models import Fundraiser, Category, Comment, Transaction
+from fundraisers.pagination import InvalidCursor, KeysetPaginator, feed_page
+from fundraisers.throttling import ThrottleMixin
+from fundraisers.votes import apply_pending
+from pomozemy.asynchronous import AsyncViewMixin, database_sync_to_async
+from pomozemy.form_cache import CachedForm, CachedFormMixin, generation
 
 
 class BaseList(ListView):
     model = Fundraiser
     template_name = 'fundraiser/fundraiser_list.html'
-    ordering = ['-pk']
+    # ?sort= choices: ordering and label, the first one is the default. Each ordering has its own index.
+    sorts = {
+        'newest': ('-pk', _('Newest')),
+        'trending': ('-trending', _('Trending')),
+        'nearly_funded': ('-funded_ratio', _('Nearly funded')),
+    }
+    paginate_by = 24
+    page_kwarg = 'cursor'
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort')
+        return sort if sort in self.sorts else next(iter(self.sorts))
+
+    def get_ordering(self):
+        return [self.sorts[self.get_sort()][0]]
+
+    def get_queryset(self):
+        query_set = super().get_queryset().with_card_data()
+        if self.get_sort() == 'nearly_funded':
+            # Fundraisers that reached their purpose are no longer nearly funded.
+            query_set = query_set.filter(funded_ratio__lt=1)
+        return query_set
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_ordering()[0])
+        try:
+            page = paginator.page(self.request.GET.get(self.page_kwarg))
+        except InvalidCursor as error:
+            raise Http404(str(error))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        object_list = apply_pending(context['object_list'])
+        context['cards'] = list(zip(object_list, render_fragments([('card', fundraiser) for fundraiser in object_list])))
+        context['sort'] = self.get_sort()
+        context['sort_choices'] = [(sort, label) for sort, (ordering, label) in self.sorts.items()]
+        # The current filters and sort, carried over by the pagination links.
+        params = self.request.GET.copy()
+        params.pop(self.page_kwarg, None)
+        context['page_query'] = params.urlencode()
+        return context
 
 
 class List(BaseList):
     def get_queryset(self):
         query_set = super().get_queryset()
-        return query_set.filter(
-            active=True,
-            start_date__lte=make_aware(datetime.now()),
-            end_date__gte=make_aware(datetime.now()),
-        )
+        return query_set.live()
 
 
 class MyList(LoginRequiredMixin, BaseList):
@@ -38,41 +82,112 @@ class MyList(LoginRequiredMixin, BaseList):
 class CategoryList(BaseList):
     def get_queryset(self):
         query_set = super().get_queryset()
-        return query_set.filter(
+        return query_set.live().filter(
             category=get_object_or_404(Category, slug=self.kwargs['slug']),
-            active=True,
-            start_date__lte=make_aware(datetime.now()),
-            end_date__gte=make_aware(datetime.now()),
         )
 
 
+class Search(BaseList):
+    sorts = {'relevance': ('-rank', _('Relevance'))}
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        # Ordered by the paginator, `rank` only exists once the search is applied.
+        return Fundraiser.objects.with_card_data().live().search(self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
+
+
 class Detail(DetailView):
     model = Fundraiser
     template_name = 'fundraiser/fundraiser_detail.html'
 
+    def get_queryset(self):
+        # The page shows the rendered description, its source is only needed for editing.
+        return super().get_queryset().select_related('category', 'owner').defer('description', 'description_text')
+
     def get_context_data(self, **kwargs):
+        if 'transactions' not in kwargs:
+            kwargs['transactions'] = feed_page(self.object.transaction_set.all())
+        if 'comments' not in kwargs:
+            kwargs['comments'] = feed_page(self.object.comment_set.all())
         context = super().get_context_data(**kwargs)
-        context['comment_form'] = CommentAddForm(fundraiser=self.object)
-        context['transaction_form'] = TransactionForm(fundraiser=self.object)
+        apply_pending([self.object])
+        context['header'], context['description'] = render_fragments([
+            ('detail_header', self.object), ('detail_description', self.object),
+        ])
+        context['comment_form'] = CachedForm(CommentAddForm, [self.object.pk], fundraiser=self.object)
+        context['transaction_form'] = CachedForm(TransactionForm, [self.object.pk], fundraiser=self.object)
         return context
 
 
-class Create(LoginRequiredMixin, CreateView):
+class AsyncListMixin(AsyncViewMixin):
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        context = await database_sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
+
+class AsyncList(AsyncListMixin, List):
+    pass
+
+
+class AsyncCategoryList(AsyncListMixin, BaseList):
+    def get_queryset(self):
+        return super().get_queryset().live().filter(category__slug=self.kwargs['slug'])
+
+    async def get(self, request, *args, **kwargs):
+        # The category is looked up alongside the page instead of before it.
+        self.object_list = self.get_queryset()
+        category_exists, context = await asyncio.gather(
+            database_sync_to_async(Category.objects.filter(slug=self.kwargs['slug']).exists)(),
+            database_sync_to_async(self.get_context_data)(),
+        )
+        if not category_exists:
+            raise Http404('No Category matches the given query.')
+        return self.render_to_response(context)
+
+
+class AsyncDetail(AsyncViewMixin, Detail):
+    async def get(self, request, *args, **kwargs):
+        pk = self.kwargs['pk']
+        self.object, transactions, comments = await asyncio.gather(
+            database_sync_to_async(self.get_object)(),
+            database_sync_to_async(feed_page)(Transaction.objects.filter(fundraiser_id=pk)),
+            database_sync_to_async(feed_page)(Comment.objects.filter(fundraiser_id=pk)),
+        )
+        context = await database_sync_to_async(self.get_context_data)(
+            object=self.object, transactions=transactions, comments=comments,
+        )
+        return self.render_to_response(context)
+
+
+class Create(LoginRequiredMixin, CachedFormMixin, CreateView):
     model = Fundraiser
     form_class = FundraiserForm
     template_name = 'form.html'
     success_url = reverse_lazy('fundraiser_list')
 
+    def get_form_cache_key(self):
+        return [generation('categories')]
+
     def form_valid(self, form):
         form.instance.owner = self.request.user
         return super().form_valid(form)
 
 
-class Update(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class Update(LoginRequiredMixin, UserPassesTestMixin, CachedFormMixin, UpdateView):
     model = Fundraiser
     form_class = FundraiserForm
     template_name = 'form.html'
 
+    def get_form_cache_key(self):
+        # Every edit of the fundraiser bumps its revision.
+        return [self.object.pk, self.object.revision, generation('categories')]
+
     def test_func(self):
         return self.request.user.pk == self.get_object().owner.pk
 
@@ -80,11 +195,21 @@ class Update(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return reverse_lazy('fundraiser_update', args=[self.object.pk])
 
 
-class Vote(View):
+class Vote(ThrottleMixin, View):
+    throttle_scope = 'vote'
+
     def post(self, request, fundraiser_id):
-        fundraiser = get_object_or_404(Fundraiser, pk=fundraiser_id)
-        if request.POST['vote'] == 'up':
-            fundraiser.upvote()
-        elif request.POST['vote'] == 'down':
-            fundraiser.downvote()
+        fundraiser = get_object_or_404(Fundraiser.objects.only('pk'), pk=fundraiser_id)
+        if request.user.is_anonymous:
+            if not request.session.session_key:
+                request.session.save()
+            fundraiser.vote(request.POST.get('vote'), session_key=request.session.session_key)
+        else:
+            fundraiser.vote(request.POST.get('vote'), user=request.user)
         return redirect('fundraiser_detail', pk=fundraiser_id)
+
+
+class Live(View):
+    def get(self, request, fundraiser_id):
+        # The event stream is served by pomozemy/asgi.py, a 204 tells EventSource clients not to reconnect.
+        return HttpResponse(status=204)
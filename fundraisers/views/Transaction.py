@@ -1,11 +1,20 @@
+import csv
+
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.views import View
 
 from fundraisers.forms import TransactionForm
-from fundraisers.models import Fundraiser
+from fundraisers.models import Fundraiser, Transaction
+from fundraisers.pagination import feed_page
+from fundraisers.throttling import ThrottleMixin
+
 
+class Add(ThrottleMixin, View):
+    throttle_scope = 'transaction'
 
-class Add(View):
     def post(self, request, fundraiser_id):
         fundraiser = get_object_or_404(Fundraiser, pk=fundraiser_id)
         form = TransactionForm(request.POST, fundraiser=fundraiser)
@@ -15,3 +24,55 @@ class Add(View):
             transaction.user = None if request.user.is_anonymous else request.user
             transaction.save()
         return redirect('fundraiser_detail', pk=fundraiser_id)
+
+
+class List(View):
+    def get(self, request, fundraiser_id):
+        fundraiser = get_object_or_404(Fundraiser.objects.only('pk'), pk=fundraiser_id)
+        context = {
+            'fundraiser_id': fundraiser.pk,
+            'transactions': feed_page(fundraiser.transaction_set.all(), request.GET.get('cursor')),
+        }
+        return HttpResponse(render_to_string('fundraiser/transaction_list.html', context))
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class Export(LoginRequiredMixin, UserPassesTestMixin, View):
+    chunk_size = 2000
+
+    def test_func(self):
+        fundraiser = get_object_or_404(Fundraiser.objects.only('owner_id'), pk=self.kwargs['pk'])
+        return self.request.user.pk == fundraiser.owner_id
+
+    def get(self, request, pk):
+        response = StreamingHttpResponse(self.rows(pk), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="fundraiser-{pk}-donations.csv"'
+        return response
+
+    def rows(self, pk):
+        writer = csv.writer(Echo())
+        # The header goes out before the query runs, so the download starts immediately.
+        yield writer.writerow(['date', 'amount', 'donor', 'comment'])
+        donations = Transaction.objects.filter(fundraiser_id=pk).order_by('pk').values_list(
+            'created_at', 'amount', 'user_id', 'user__first_name', 'user__last_name', 'comment',
+        )
+        chunk = []
+        for created_at, amount, user_id, first_name, last_name, comment in donations.iterator(self.chunk_size):
+            donor = f'{first_name} {last_name}'.strip() if user_id else 'Anonymous'
+            chunk.append(writer.writerow([created_at.isoformat(), amount, _cell(donor), _cell(comment)]))
+            if len(chunk) == self.chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+
+def _cell(value):
+    # Keep spreadsheet applications from evaluating donor-supplied text as a formula.
+    if value[:1] in ('=', '+', '-', '@'):
+        return f"'{value}"
+    return value
@@ -1,3 +1,4 @@
 from fundraisers.views import Fundraiser
 from fundraisers.views import Comment
 from fundraisers.views import Transaction
+from fundraisers.views import Api
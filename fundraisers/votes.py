@@ -0,0 +1,104 @@
+"""
+Write-behind buffer for vote counters, used when VOTE_BUFFERING is enabled.
+
+Votes still record their Vote row, but instead of updating the Fundraiser row on every click the
+deltas are added to counters in the shared cache and ``manage.py flush_votes`` writes them with one
+UPDATE per batch. Fundraisers with unflushed votes are kept in a pending set, which a flush reads and
+clears in one atomic step: a vote registering its fundraiser after that is left for the next flush.
+With RedisCache the set is a Redis set, other backends keep it through the cache API under a process
+lock, which is only atomic for LocMemCache, a per-process cache anyway.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+PENDING_KEY = 'fundraisers:votes:pending'
+FIELDS = ('votes_positive', 'votes_negative')
+
+_lock = threading.Lock()
+
+
+def _delta_key(pk, field):
+    return f'fundraisers:votes:{pk}:{field}'
+
+
+def _incr(key, delta):
+    cache.add(key, 0, None)
+    return cache.incr(key, delta)
+
+
+def _redis_client():
+    backend = caches['default']
+    if not isinstance(backend, RedisCache):
+        return None, None
+    key = backend.make_key(PENDING_KEY)
+    return backend._cache.get_client(key, write=True), key
+
+
+def _register(pk):
+    client, key = _redis_client()
+    if client is not None:
+        client.sadd(key, pk)
+        return
+    with _lock:
+        cache.set(PENDING_KEY, cache.get(PENDING_KEY, set()) | {pk}, None)
+
+
+def _take_pending():
+    client, key = _redis_client()
+    if client is not None:
+        pipeline = client.pipeline(transaction=True)
+        pipeline.smembers(key)
+        pipeline.delete(key)
+        members, _ = pipeline.execute()
+        return sorted(int(member) for member in members)
+    with _lock:
+        pks = cache.get(PENDING_KEY, set())
+        cache.delete(PENDING_KEY)
+    return sorted(pks)
+
+
+def add(pk, votes_positive=0, votes_negative=0):
+    for field, delta in zip(FIELDS, (votes_positive, votes_negative)):
+        if delta:
+            _incr(_delta_key(pk, field), delta)
+    # Registered after the deltas, so a flush that misses this vote's deltas still finds the fundraiser later.
+    _register(pk)
+
+
+def pending(pks):
+    """Unflushed deltas as {pk: {field: delta}}, fundraisers without any are left out."""
+    keys = {_delta_key(pk, field): (pk, field) for pk in pks for field in FIELDS}
+    deltas = {}
+    for key, delta in cache.get_many(keys).items():
+        if delta:
+            pk, field = keys[key]
+            deltas.setdefault(pk, {})[field] = delta
+    return deltas
+
+
+def apply_pending(fundraisers):
+    """Adds the unflushed deltas to the displayed counters of the given fundraisers."""
+    if not settings.VOTE_BUFFERING:
+        return fundraisers
+    deltas = pending([fundraiser.pk for fundraiser in fundraisers])
+    for fundraiser in fundraisers:
+        for field, delta in deltas.get(fundraiser.pk, {}).items():
+            setattr(fundraiser, field, getattr(fundraiser, field) + delta)
+    return fundraisers
+
+
+def take():
+    """
+    Removes the buffered deltas from the cache and returns them as {pk: {field: delta}}, for
+    Fundraiser.add_votes_many(). Deltas taken but never written are lost, never counted twice.
+    """
+    pks = _take_pending()
+    deltas = pending(pks)
+    for pk, fields in deltas.items():
+        for field, delta in fields.items():
+            # Subtracting what was read keeps increments made in the meantime.
+            cache.decr(_delta_key(pk, field), delta)
+    return deltas
@@ -9,8 +9,29 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.urls import Resolver404, resolve
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pomozemy.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from fundraisers.live import live_application  # noqa: E402
+
+if settings.WARM_UP_WORKERS:
+    from pomozemy.warmup import warm_up
+
+    warm_up()
+
+
+async def application(scope, receive, send):
+    # Event streams are long-lived, they bypass Django so they do not hold a request thread each.
+    if scope['type'] == 'http' and scope['path'].endswith('/live/'):
+        try:
+            match = resolve(scope['path'])
+        except Resolver404:
+            match = None
+        if match and match.url_name == 'fundraiser_live':
+            return await live_application(scope, receive, send, **match.kwargs)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,41 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def database_sync_to_async(func):
+    """
+    Runs a blocking ORM call in the executor instead of the request's thread-sensitive thread, so several
+    calls can be awaited concurrently. Each executor thread holds its own connection, which is released
+    according to CONN_MAX_AGE just like at the end of a request.
+    """
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+class AsyncViewMixin:
+    """
+    Lets a class-based view define ``async def`` handlers. Django 4.0 only recognises coroutine
+    functions as async views, so the view returned by ``as_view()`` is wrapped in one.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        return functools.update_wrapper(async_view, view)
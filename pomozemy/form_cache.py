@@ -0,0 +1,87 @@
+"""
+Cache of rendered unbound forms.
+
+An unbound form renders the same for every visitor apart from the CSRF token, so its crispy output is
+cached with a placeholder instead of the token, and the token of the current request is put in when it
+is shown. ``CachedForm`` stands in for the form in the template context and only builds the form, its
+FormHelper and action URL on a cache miss. ``{% cached_crispy %}`` renders either one, bound forms
+with errors are rendered as usual.
+"""
+import time
+
+from crispy_forms.utils import render_crispy_form
+from django import template
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+CSRF_PLACEHOLDER = 'csrf-token-placeholder'
+# Keys change with the data shown in the form, the timeout only bounds how long superseded forms linger.
+FORM_CACHE_TIMEOUT = 60 * 60 * 24
+
+register = template.Library()
+
+
+def generation_key(name):
+    return f'forms:generation:{name}'
+
+
+def generation(name):
+    """Key part of the forms showing ``name`` data, such as the choices of a select."""
+    return cache.get_or_set(generation_key(name), time.time_ns, None)
+
+
+def invalidate_forms(name):
+    cache.set(generation_key(name), time.time_ns(), None)
+
+
+class CachedForm:
+    def __init__(self, form_class, key=(), **kwargs):
+        self.form_class = form_class
+        self.key = key
+        self.kwargs = kwargs
+
+    @cached_property
+    def form(self):
+        return self.form_class(**self.kwargs)
+
+    def __getattr__(self, name):
+        # Anything else is looked up on the form, which builds it.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.form, name)
+
+    def cache_key(self):
+        parts = ':'.join(str(part) for part in self.key)
+        return f'forms:{self.form_class.__module__}.{self.form_class.__qualname__}:{parts}:{get_language()}'
+
+    def render(self, csrf_token):
+        key = self.cache_key()
+        html = cache.get(key)
+        if html is None:
+            html = render_crispy_form(self.form, context={'csrf_token': CSRF_PLACEHOLDER})
+            cache.set(key, html, FORM_CACHE_TIMEOUT)
+        return mark_safe(html.replace(CSRF_PLACEHOLDER, escape(csrf_token)))
+
+
+class CachedFormMixin:
+    """Puts a CachedForm in the context of form views when there is no bound form to show."""
+
+    def get_form_cache_key(self):
+        return ()
+
+    def get_context_data(self, **kwargs):
+        if 'form' not in kwargs:
+            form_kwargs = self.get_form_kwargs()
+            if 'data' not in form_kwargs:
+                kwargs['form'] = CachedForm(self.get_form_class(), self.get_form_cache_key(), **form_kwargs)
+        return super().get_context_data(**kwargs)
+
+
+@register.simple_tag(takes_context=True)
+def cached_crispy(context, form):
+    if isinstance(form, CachedForm):
+        return form.render(str(context.get('csrf_token', '')))
+    return render_crispy_form(form, context=context.flatten())
@@ -0,0 +1,176 @@
+"""
+Per-request instrumentation: query count, SQL time, duplicate queries, and the time spent rendering
+templates, crispy forms and context processors.
+
+The numbers are sent as a Server-Timing header, so they show in the browser's network panel, and
+logged as one JSON line per request to the ``pomozemy.requests`` logger. Requests using more queries
+than their URL name's entry in QUERY_BUDGETS are logged as warnings, or fail when
+QUERY_BUDGET_ACTION is 'raise'. Queries are timed with database execute wrappers, so nothing depends
+on DEBUG, but only the request's own thread is seen: queries the async views run in executor threads
+are not counted. Each time excludes the others measured inside it, so queries run while rendering
+count as SQL time and crispy forms are not part of template time. Context processors returning lazy
+objects are only timed for creating them, evaluating them is part of the template time.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from crispy_forms.templatetags.crispy_forms_tags import CrispyFormNode
+from django.conf import settings
+from django.db import connections
+from django.template import base
+from django.template.context import RequestContext
+
+logger = logging.getLogger('pomozemy.requests')
+
+_current = ContextVar('request_stats', default=None)
+_template_render = base.Template.render
+_crispy_render = CrispyFormNode.render
+_bind_template = RequestContext.bind_template
+_installed = False
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.duplicate_queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.crispy_time = 0.0
+        self.context_processor_time = 0.0
+        self.template_depth = 0
+        self._seen = set()
+
+    def measured_time(self):
+        return self.sql_time + self.template_time + self.crispy_time + self.context_processor_time
+
+    @contextmanager
+    def timing(self, name):
+        # Adds the time not already measured by the timings nested in this one.
+        measured = self.measured_time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started - (self.measured_time() - measured)
+            setattr(self, name, getattr(self, name) + elapsed)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            # The same statement with the same parameters, a result that could have been reused.
+            key = hash((sql, repr(params)))
+            if key in self._seen:
+                self.duplicate_queries += 1
+            else:
+                self._seen.add(key)
+
+
+def _instrumented_render(self, context):
+    stats = _current.get()
+    if stats is None or stats.template_depth:
+        return _template_render(self, context)
+    # Only the outermost render is timed, included templates and fragments are part of it.
+    stats.template_depth += 1
+    try:
+        with stats.timing('template_time'):
+            return _template_render(self, context)
+    finally:
+        stats.template_depth -= 1
+
+
+def _instrumented_crispy_render(self, context):
+    stats = _current.get()
+    if stats is None:
+        return _crispy_render(self, context)
+    # Covers {% crispy %} and render_crispy_form, which renders a CrispyFormNode. The form's own
+    # templates are rendered as nested ones, so they count as crispy time.
+    stats.template_depth += 1
+    try:
+        with stats.timing('crispy_time'):
+            return _crispy_render(self, context)
+    finally:
+        stats.template_depth -= 1
+
+
+@contextmanager
+def _instrumented_bind_template(self, template):
+    stats = _current.get()
+    with ExitStack() as stack:
+        # Binding the template runs the context processors.
+        with stats.timing('context_processor_time') if stats is not None else ExitStack():
+            stack.enter_context(_bind_template(self, template))
+        yield
+
+
+def install():
+    """Patches the rendering methods once per process, however many handlers build the middleware."""
+    global _installed
+    if not _installed:
+        base.Template.render = _instrumented_render
+        CrispyFormNode.render = _instrumented_crispy_render
+        RequestContext.bind_template = _instrumented_bind_template
+        _installed = True
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        timing = (
+            f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries, '
+            f'{stats.duplicate_queries} duplicate", '
+            f'template;dur={stats.template_time * 1000:.1f}, crispy;dur={stats.crispy_time * 1000:.1f}, '
+            f'context;dur={stats.context_processor_time * 1000:.1f};desc="context processors", '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+
+        record = {
+            'url_name': url_name,
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'queries': stats.queries,
+            'duplicate_queries': stats.duplicate_queries,
+            'sql_ms': round(stats.sql_time * 1000, 1),
+            'template_ms': round(stats.template_time * 1000, 1),
+            'crispy_ms': round(stats.crispy_time * 1000, 1),
+            'context_processors_ms': round(stats.context_processor_time * 1000, 1),
+        }
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, separators=(',', ':')))
+        budget = settings.QUERY_BUDGETS.get(url_name)
+        if budget is not None and stats.queries > budget:
+            message = f'{url_name} ran {stats.queries} queries, its budget is {budget}.'
+            if settings.QUERY_BUDGET_ACTION == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={'request_stats': record})
+        return response
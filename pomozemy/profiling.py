@@ -0,0 +1,120 @@
+"""
+Opt-in sampling profiler for requests, enabled by PROFILING_DIR.
+
+One background thread per process looks at the stacks of the threads serving profiled requests every
+PROFILING_INTERVAL seconds, so the requests themselves run unmodified. A PROFILING_SAMPLE_RATE fraction of
+requests is profiled, plus every request slower than PROFILING_SLOW_THRESHOLD seconds, which means all
+requests are sampled while a threshold is set and only the slow ones are kept. Each kept profile is
+written in the collapsed stack format used by flamegraph.pl and speedscope, to
+``PROFILING_DIR/<url name>/``. ``manage.py merge_profiles`` ranks the hot functions across them.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+_labels = {}
+_paths = sorted((path for path in sys.path if path), key=len, reverse=True)
+
+
+def frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for path in _paths:
+            if filename.startswith(path):
+                filename = filename[len(path):].lstrip(os.sep)
+                break
+        name = getattr(code, 'co_qualname', code.co_name)
+        # Semicolons separate frames and spaces the count in the collapsed format.
+        label = f'{filename}:{code.co_firstlineno}:{name}'.replace(';', ':').replace(' ', '_')
+        _labels[code] = label
+    return label
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Sampler:
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.active = {}
+        self.thread = None
+
+    def start(self, thread_id):
+        samples = Counter()
+        with self.lock:
+            self.active[thread_id] = samples
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='profiling-sampler', daemon=True)
+                self.thread.start()
+        return samples
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.active.pop(thread_id, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    # Started again by the next profiled request.
+                    self.thread = None
+                    return
+                active = list(self.active.items())
+            frames = sys._current_frames()
+            for thread_id, samples in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[collapse(frame)] += 1
+
+
+def write_profile(directory, url_name, duration, samples):
+    directory = Path(directory) / (url_name or 'unresolved')
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'{int(time.time() * 1000)}-{duration * 1000:.0f}ms-{os.getpid()}-{uuid.uuid4().hex[:8]}.collapsed'
+    path = directory / name
+    path.write_text(''.join(f'{stack} {count}\n' for stack, count in samples.most_common()))
+    return path
+
+
+class SamplingProfilerMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR or (
+            not settings.PROFILING_SAMPLE_RATE and settings.PROFILING_SLOW_THRESHOLD is None
+        ):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sampler = Sampler(settings.PROFILING_INTERVAL)
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        threshold = settings.PROFILING_SLOW_THRESHOLD
+        if not sampled and threshold is None:
+            return self.get_response(request)
+
+        thread_id = threading.get_ident()
+        self.sampler.start(thread_id)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            samples = self.sampler.stop(thread_id)
+            if samples and (sampled or duration >= threshold):
+                url_name = request.resolver_match.url_name if request.resolver_match else None
+                write_profile(settings.PROFILING_DIR, url_name, duration, samples)
@@ -0,0 +1,130 @@
+"""
+Sanitizing of the rich text edited with TinyMCE, done once when a fundraiser or static page is saved.
+
+Only an allow-list of tags and attributes is kept, links and images must use a safe scheme, the
+content of scripts, styles and embedded objects is dropped and unclosed tags are closed. Alongside the
+safe HTML the plain text (for search) and a short excerpt (for list cards) are produced, so views
+never parse the source again.
+"""
+import re
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.utils.text import Truncator
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li',
+    'ol', 'p', 'pre', 's', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Dropped together with everything inside them.
+DROPPED_TAGS = {'iframe', 'noscript', 'object', 'script', 'style', 'template'}
+# Separate words in the plain text, inline tags do not.
+BLOCK_TAGS = {
+    'blockquote', 'br', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'p', 'pre', 'td', 'th', 'tr',
+}
+# Start tags that close an open element of these kinds first, as browsers parse them.
+IMPLIED_ENDS = {
+    'li': {'li'},
+    'tr': {'tr', 'td', 'th'},
+    'td': {'td', 'th'},
+    'th': {'td', 'th'},
+    **{tag: {'p'} for tag in (BLOCK_TAGS - {'br', 'li', 'td', 'th', 'tr'}) | {'ol', 'table', 'ul'}},
+}
+EXCERPT_LENGTH = 200
+
+RenderedHTML = namedtuple('RenderedHTML', 'html text excerpt')
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+        while self.open_tags and self.open_tags[-1] in IMPLIED_ENDS.get(tag, ()):
+            self.html.append(f'</{self.open_tags.pop()}>')
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        attributes = ''
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not self.safe_url(value):
+                continue
+            attributes += f' {name}="{escape(value)}"'
+        if tag == 'a':
+            attributes += ' rel="nofollow noopener"'
+        self.html.append(f'<{tag}{attributes}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # `<p/>` is an empty element, a self-closed dropped tag has no content to drop.
+        if tag not in DROPPED_TAGS:
+            self.handle_starttag(tag, attrs)
+            if tag not in VOID_TAGS:
+                self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open_tags:
+            return
+        # Tags left open inside this one are closed with it.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.html.append(escape(data, quote=False))
+            self.text.append(data)
+
+    @staticmethod
+    def safe_url(value):
+        try:
+            return urlsplit(value.strip()).scheme.lower() in URL_SCHEMES
+        except ValueError:
+            return False
+
+    def result(self):
+        self.close()
+        html = ''.join(self.html) + ''.join(f'</{tag}>' for tag in reversed(self.open_tags))
+        return html, re.sub(r'\s+', ' ', ''.join(self.text)).strip()
+
+
+def render_html(value):
+    """Safe HTML, plain text and excerpt of user-edited rich text."""
+    sanitizer = Sanitizer()
+    sanitizer.feed(value or '')
+    html, text = sanitizer.result()
+    return RenderedHTML(html, text, Truncator(text).chars(EXCERPT_LENGTH))
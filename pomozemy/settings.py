@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pomozemy.profiling.SamplingProfilerMiddleware',
+    'pomozemy.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +56,52 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'pomozemy.urls'
 
+# Route the read-only pages to their async views, only worth it when served through asgi.py.
+ASYNC_VIEWS = False
+
+# Count votes in the cache and write them in batches with `manage.py flush_votes`, run it every few seconds.
+VOTE_BUFFERING = False
+
+# Token buckets per IP address, session and user: (requests, seconds) allows bursts of `requests` refilled
+# over `seconds`, see fundraisers/throttling.py. Over the limit the views answer 429 with Retry-After.
+THROTTLE_RATES = {
+    'comment': (5, 60),
+    'transaction': (10, 60),
+    'vote': (20, 60),
+}
+
+# Source of the live progress streamed to the fundraiser page under ASGI, checked every interval in seconds.
+LIVE_UPDATES_BACKEND = 'fundraisers.live.DatabaseBackend'
+LIVE_UPDATES_INTERVAL = 2
+
+# Most queries a request to each URL name may run, see pomozemy/instrumentation.py. Exceeding one is
+# logged as a warning, or fails the request when the action is 'raise'.
+QUERY_BUDGETS = {
+    'index': 6,
+    'static_page': 6,
+    'fundraiser_list': 6,
+    'fundraiser_category_list': 7,
+    'fundraiser_my_list': 8,
+    'fundraiser_search': 6,
+    'fundraiser_detail': 10,
+    'fundraiser_comment_list': 6,
+    'fundraiser_transaction_list': 6,
+    'api_fundraiser_list': 3,
+    'api_fundraiser_bulk': 3,
+    'api_fundraiser_detail': 3,
+    'api_fundraiser_progress': 3,
+    'api_fundraiser_history': 3,
+    'api_category_list': 3,
+}
+QUERY_BUDGET_ACTION = 'log'
+
+# Sampling profiler, see pomozemy/profiling.py. Off while PROFILING_DIR is None, otherwise profiles the
+# given fraction of requests and every request slower than the threshold in seconds.
+PROFILING_DIR = None
+PROFILING_SAMPLE_RATE = 0
+PROFILING_SLOW_THRESHOLD = None
+PROFILING_INTERVAL = 0.005
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -68,13 +116,34 @@ TEMPLATES = [
                 'fundraisers.context_processors.fundraisers_context',
                 'static_pages.context_processors.static_pages_context',
             ],
+            'libraries': {
+                'form_cache': 'pomozemy.form_cache',
+            },
         },
     },
 ]
 
+# Keep compiled templates in memory, for production (Django only does it by default without DEBUG).
+CACHED_TEMPLATES = False
+
+# Compile all templates and populate the URL resolver when a worker starts, see pomozemy/warmup.py.
+WARM_UP_WORKERS = False
+
 WSGI_APPLICATION = 'pomozemy.wsgi.application'
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Navigation menus and other shared state are invalidated through the cache, so every worker
+# must use the same backend in production (see local_settings.py.dist).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -111,6 +180,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Pre-rendered static pages and index page, served to anonymous visitors when set.
+STATIC_PAGES_EXPORT_ROOT = None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -125,3 +197,23 @@ try:
 except ModuleNotFoundError:
     print('File local_settings.py not found!')
     exit(0)
+
+# Optional overrides of the defaults above
+from pomozemy import local_settings  # noqa: E402
+
+for _name in (
+    'CACHES', 'STATIC_PAGES_EXPORT_ROOT', 'ASYNC_VIEWS', 'VOTE_BUFFERING', 'QUERY_BUDGETS', 'QUERY_BUDGET_ACTION',
+    'PROFILING_DIR', 'PROFILING_SAMPLE_RATE', 'PROFILING_SLOW_THRESHOLD', 'PROFILING_INTERVAL', 'CACHED_TEMPLATES',
+    'WARM_UP_WORKERS', 'THROTTLE_RATES', 'LIVE_UPDATES_BACKEND', 'LIVE_UPDATES_INTERVAL',
+):
+    if hasattr(local_settings, _name):
+        globals()[_name] = getattr(local_settings, _name)
+
+if CACHED_TEMPLATES:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
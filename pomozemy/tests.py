@@ -0,0 +1,135 @@
+import copy
+import json
+import logging
+import threading
+import time
+
+import pytest
+from crispy_forms.utils import render_crispy_form
+from django.db import connection
+from django.template import base, engines
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from fundraisers.forms import CommentAddForm
+from fundraisers.models import Fundraiser
+from pomozemy import instrumentation, profiling, sanitizer, warmup
+
+
+@pytest.mark.django_db
+class TestInstrumentation:
+    def test_server_timing_and_log(self, client: Client, fundraisers, caplog):
+        with caplog.at_level(logging.INFO, logger='pomozemy.requests'):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(reverse('fundraiser_detail', args=[fundraisers[0].pk]))
+        timing = response['Server-Timing']
+        assert f'desc="{len(context.captured_queries)} queries, 0 duplicate"' in timing
+        assert 'template;dur=' in timing and 'total;dur=' in timing
+        assert 'crispy;dur=' in timing and 'context;dur=' in timing
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['url_name'] == 'fundraiser_detail'
+        assert record['queries'] == len(context.captured_queries)
+        assert record['template_ms'] > 0
+        assert record['context_processors_ms'] >= 0 and record['crispy_ms'] >= 0
+
+    def test_crispy_apart_from_template(self, fundraisers):
+        instrumentation.InstrumentationMiddleware(lambda request: None)
+        instrumentation.InstrumentationMiddleware(lambda request: None)
+        assert base.Template.render is instrumentation._instrumented_render
+
+        stats = instrumentation.RequestStats()
+        token = instrumentation._current.set(stats)
+        try:
+            with connection.execute_wrapper(stats):
+                render_crispy_form(CommentAddForm(fundraiser=fundraisers[0]))
+        finally:
+            instrumentation._current.reset(token)
+        assert stats.crispy_time > 0
+        assert stats.template_time == 0
+
+    def test_duplicate_queries(self, fundraisers):
+        stats = instrumentation.RequestStats()
+        with connection.execute_wrapper(stats):
+            for pk in (fundraisers[0].pk, fundraisers[1].pk, fundraisers[0].pk):
+                Fundraiser.objects.get(pk=pk)
+        assert (stats.queries, stats.duplicate_queries) == (3, 1)
+
+    def test_query_budget(self, client: Client, fundraisers, settings, caplog):
+        settings.QUERY_BUDGETS = {'fundraiser_list': 0}
+        settings.QUERY_BUDGET_ACTION = 'log'
+        assert client.get(reverse('fundraiser_list')).status_code == 200
+        assert 'fundraiser_list ran' in caplog.text
+
+        settings.QUERY_BUDGET_ACTION = 'raise'
+        with pytest.raises(instrumentation.QueryBudgetExceeded):
+            client.get(reverse('fundraiser_list'))
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    def test_sampler(self):
+        sampler = profiling.Sampler(0.001)
+
+        def busy_loop():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+        samples = sampler.start(threading.get_ident())
+        busy_loop()
+        assert sampler.stop(threading.get_ident()) is samples
+        assert any(stack.rsplit(';', 1)[-1].endswith('busy_loop') for stack in samples)
+        assert all(' ' not in stack for stack in samples)
+
+    def test_slow_requests(self, client: Client, fundraisers, settings, tmp_path):
+        settings.PROFILING_DIR = str(tmp_path)
+        settings.PROFILING_SLOW_THRESHOLD = 0
+        settings.PROFILING_INTERVAL = 0.0005
+        for _ in range(3):
+            client.get(reverse('fundraiser_detail', args=[fundraisers[0].pk]))
+        assert list(tmp_path.glob('fundraiser_detail/*.collapsed'))
+
+        settings.PROFILING_SLOW_THRESHOLD = 60
+        client.get(reverse('fundraiser_list'))
+        assert not list(tmp_path.glob('fundraiser_list/*'))
+
+
+class TestSanitizer:
+    @pytest.mark.parametrize('source, html', [
+        ('<p onclick="steal()">Hi <b>there<i>!</p>', '<p>Hi <b>there<i>!</i></b></p>'),
+        ('<script>alert(1)</script><style>p {}</style><p>Text</p>', '<p>Text</p>'),
+        ('<a href="javascript:alert(1)" target="_blank">x</a>', '<a rel="nofollow noopener">x</a>'),
+        (
+            '<a href="https://example.com/?a=1&amp;b=2">x</a>',
+            '<a href="https://example.com/?a=1&amp;b=2" rel="nofollow noopener">x</a>',
+        ),
+        ('<img src="java&#10;script:x" alt="A"><img src="/a.png"/>', '<img alt="A"><img src="/a.png">'),
+        ('<ul><li>One<li>Two</ul>&lt;tag&gt;', '<ul><li>One</li><li>Two</li></ul>&lt;tag&gt;'),
+    ])
+    def test_sanitize(self, source, html):
+        assert sanitizer.render_html(source).html == html
+
+    def test_text_and_excerpt(self):
+        rendered = sanitizer.render_html('<h2>Title</h2><p>Some <b>bold</b>text</p>' + '<p>word</p>' * 100)
+        assert rendered.text.startswith('Title Some boldtext word word')
+        assert len(rendered.excerpt) == sanitizer.EXCERPT_LENGTH
+        assert rendered.excerpt.endswith('…')
+
+
+class TestWarmUp:
+    def test_cached_templates(self, settings):
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]['APP_DIRS'] = False
+        templates[0]['OPTIONS']['loaders'] = [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ]
+        settings.TEMPLATES = templates
+
+        assert warmup.warm_up() > 0
+        loader = engines['django'].engine.template_loaders[0]
+        for name in ('form.html', 'fundraiser/fundraiser_detail.html', 'bootstrap5/whole_uni_form.html'):
+            assert name in loader.get_template_cache
@@ -0,0 +1,71 @@
+"""
+Warm-up of a fresh worker, run by wsgi.py and asgi.py when WARM_UP_WORKERS is set.
+
+Every template of the project and the installed apps is compiled, including the crispy bootstrap5
+pack, which imports the template tag libraries they load. With CACHED_TEMPLATES the compiled
+templates stay in the cached loader, otherwise only the imports are kept. The URL resolver is
+populated and the default language's translations are loaded, so the first request a worker serves
+costs what the following ones do.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger('pomozemy.warmup')
+
+
+def template_dirs(engine):
+    loaders = list(engine.template_loaders)
+    while loaders:
+        loader = loaders.pop(0)
+        # The cached loader wraps the loaders that find the templates.
+        if hasattr(loader, 'loaders'):
+            loaders[:0] = loader.loaders
+        elif hasattr(loader, 'get_dirs'):
+            yield from loader.get_dirs()
+
+
+def template_names(engine):
+    names = set()
+    for directory in template_dirs(engine):
+        directory = Path(directory)
+        if directory.is_dir():
+            names.update(
+                path.relative_to(directory).as_posix() for path in directory.rglob('*')
+                if path.is_file() and not path.name.startswith('.')
+            )
+    return sorted(names)
+
+
+def compile_templates():
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                # Files in template directories that are not Django templates.
+                logger.debug('Not compiled %s: %s', name, error)
+            else:
+                compiled += 1
+    return compiled
+
+
+def warm_up():
+    started = time.perf_counter()
+    compiled = compile_templates()
+    # Populates the resolver's lookup tables.
+    get_resolver().reverse_dict
+    # Activating a language loads its catalogs.
+    with translation.override(settings.LANGUAGE_CODE):
+        pass
+    logger.info('Worker warmed up in %.0f ms, %d templates compiled.', (time.perf_counter() - started) * 1000, compiled)
+    return compiled
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StaticPageConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'static_pages'
+
+    def ready(self):
+        import static_pages.signals  # noqa: F401
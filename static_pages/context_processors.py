@@ -1,7 +1,24 @@
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
 from static_pages.models import StaticPage
 
+NAV_STATIC_PAGES_CACHE_KEY = 'static_pages:nav_static_pages'
+
+
+def nav_static_pages():
+    static_pages = cache.get(NAV_STATIC_PAGES_CACHE_KEY)
+    if static_pages is None:
+        static_pages = list(StaticPage.objects.order_by('pk').values('slug', 'title'))
+        cache.set(NAV_STATIC_PAGES_CACHE_KEY, static_pages, None)
+    return static_pages
+
+
+def invalidate_nav_static_pages():
+    cache.delete(NAV_STATIC_PAGES_CACHE_KEY)
+
 
 def static_pages_context(request):
     return {
-        'static_pages': StaticPage.objects.all(),
+        'static_pages': SimpleLazyObject(nav_static_pages),
     }
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from static_pages.publish import export_root, publish_all
+
+
+class Command(BaseCommand):
+    help = 'Renders every static page and the index page to STATIC_PAGES_EXPORT_ROOT.'
+
+    def handle(self, *args, **options):
+        if not export_root():
+            raise CommandError('STATIC_PAGES_EXPORT_ROOT is not set.')
+        count = publish_all()
+        self.stdout.write(f'Published {count} static pages and the index page to {export_root()}.')
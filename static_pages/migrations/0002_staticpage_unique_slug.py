@@ -0,0 +1,29 @@
+# Generated by Django 4.0.3 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+def deduplicate_slugs(apps, schema_editor):
+    Model = apps.get_model('static_pages', 'StaticPage')
+    seen = set()
+    for pk, slug in Model.objects.order_by('pk').values_list('pk', 'slug'):
+        if slug in seen:
+            suffix = f'-{pk}'
+            Model.objects.filter(pk=pk).update(slug=slug[:50 - len(suffix)] + suffix)
+        seen.add(slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('static_pages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='staticpage',
+            name='slug',
+            field=models.SlugField(unique=True),
+        ),
+    ]
@@ -1,18 +1,31 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.text import slugify
+from django.utils.translation import gettext_lazy as _
 from tinymce.models import HTMLField
 
+from pomozemy.sanitizer import render_html
+
 
 class StaticPage(models.Model):
     title = models.CharField(max_length=50)
-    slug = models.SlugField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
     body = HTMLField()
+    # Rendered from the body on save, see pomozemy/sanitizer.py.
+    body_html = models.TextField(blank=True, editable=False)
+    body_text = models.TextField(blank=True, editable=False)
+    body_excerpt = models.CharField(max_length=255, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'({self.pk}){self.title}'
 
+    def clean(self):
+        if StaticPage.objects.filter(slug=slugify(self.title)).exclude(pk=self.pk).exists():
+            raise ValidationError({'title': _('A page with this title already exists.')})
+
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
+        self.body_html, self.body_text, self.body_excerpt = render_html(self.body)
         super(StaticPage, self).save(*args, **kwargs)
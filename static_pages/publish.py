@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from static_pages.models import StaticPage
+
+
+def export_root():
+    root = settings.STATIC_PAGES_EXPORT_ROOT
+    return Path(root) if root else None
+
+
+def export_path(url):
+    return export_root() / url.strip('/') / 'index.html'
+
+
+def _anonymous_request(url):
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = url
+    request.user = AnonymousUser()
+    return request
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = content.encode()
+    for target, payload in ((path, data), (path.with_name(path.name + '.gz'), gzip.compress(data, mtime=0))):
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            file.write(payload)
+        os.replace(file.name, target)
+
+
+def publish_page(page):
+    url = reverse('static_page', args=[page.slug])
+    # The menu leaves out the live fundraiser counts, exported pages are not republished when they change.
+    _write(export_path(url), render_to_string(
+        'static_page/static_page.html', {'object': page, 'exported': True}, _anonymous_request(url),
+    ))
+
+
+def publish_index():
+    url = reverse('index')
+    _write(export_path(url), render_to_string(
+        'static_page/index.html', {'exported': True}, _anonymous_request(url),
+    ))
+
+
+def publish_all():
+    # Every page embeds the navigation menu, so a change to it invalidates all of them.
+    pages_root = export_path(reverse('static_page', args=['slug'])).parent.parent
+    published = set()
+    for page in StaticPage.objects.iterator():
+        publish_page(page)
+        published.add(page.slug)
+    publish_index()
+    if pages_root.is_dir():
+        for directory in pages_root.iterdir():
+            if directory.name not in published:
+                shutil.rmtree(directory)
+    return len(published)
+
+
+def exported_content(url, accept_encoding=''):
+    root = export_root()
+    if root is None:
+        return None, None
+    path = export_path(url)
+    if 'gzip' in accept_encoding:
+        path, encoding = path.with_name(path.name + '.gz'), 'gzip'
+    else:
+        encoding = None
+    try:
+        return path.read_bytes(), encoding
+    except FileNotFoundError:
+        return None, None
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from static_pages.context_processors import invalidate_nav_static_pages
+from static_pages.models import StaticPage
+from static_pages.publish import export_root, publish_all, publish_page
+
+# Fields shown in the navigation menu embedded in every exported page.
+NAV_FIELDS = {
+    'static_pages.StaticPage': ('slug', 'title'),
+    'fundraisers.Category': ('slug', 'name'),
+}
+
+
+@receiver([post_save, post_delete], sender=StaticPage)
+def nav_static_pages_changed(sender, **kwargs):
+    invalidate_nav_static_pages()
+
+
+def _nav_values(sender, instance):
+    return tuple(str(getattr(instance, field)) for field in NAV_FIELDS[sender._meta.label])
+
+
+@receiver(pre_save, sender=StaticPage)
+@receiver(pre_save, sender='fundraisers.Category')
+def remember_nav_values(sender, instance, **kwargs):
+    if export_root() and instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        instance._published_nav_values = previous and _nav_values(sender, previous)
+
+
+@receiver(post_save, sender=StaticPage)
+@receiver(post_save, sender='fundraisers.Category')
+def republish_saved(sender, instance, created, **kwargs):
+    if not export_root():
+        return
+    if created or getattr(instance, '_published_nav_values', None) != _nav_values(sender, instance):
+        transaction.on_commit(publish_all)
+    elif sender is StaticPage:
+        # Only the page itself changed.
+        transaction.on_commit(lambda: publish_page(instance))
+
+
+@receiver(post_delete, sender=StaticPage)
+@receiver(post_delete, sender='fundraisers.Category')
+def republish_deleted(sender, **kwargs):
+    if export_root():
+        transaction.on_commit(publish_all)
@@ -1,7 +1,19 @@
+import gzip
+
 import pytest
-from django.test import Client
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from fundraisers.models import Category
+from static_pages.models import StaticPage
+from static_pages.views import AsyncShowPage
+
 
 class TestViews:
     @pytest.mark.django_db
@@ -17,8 +29,120 @@ class TestViews:
             assert response.status_code == 200
             assert response.context['object'].body == static_page.body
 
+    @pytest.mark.django_db
+    def test_static_page_sanitized(self):
+        page = StaticPage.objects.create(title='Rules', body='<p>Be <b>nice</b></p><iframe src="x"></iframe>')
+        assert (page.body_html, page.body_text) == ('<p>Be <b>nice</b></p>', 'Be nice')
+        response = Client().get(reverse('static_page', args=(page.slug,)))
+        assert '<p>Be <b>nice</b></p>' in response.content.decode()
+        assert 'iframe' not in response.content.decode()
+
     @pytest.mark.django_db
     def test_static_page_detail_not_found(self):
         client = Client()
         response = client.get(reverse('static_page', args=('not-valid',)))
         assert response.status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async_static_page_detail(self, static_pages):
+        view = AsyncShowPage.as_view()
+        request = RequestFactory().get(reverse('static_page', args=(static_pages[0].slug,)))
+        request.user = AnonymousUser()
+        response = async_to_sync(view)(request, slug=static_pages[0].slug).render()
+        assert response.status_code == 200
+        assert response.context_data['object'].body == static_pages[0].body
+
+        request = RequestFactory().get(reverse('static_page', args=('not-valid',)))
+        with pytest.raises(Http404):
+            async_to_sync(view)(request, slug='not-valid')
+
+    @pytest.mark.django_db
+    def test_nav_static_pages_cached(self, static_pages):
+        client = Client()
+        response = client.get(reverse('index'))
+        assert [page['slug'] for page in response.context['static_pages']] == [page.slug for page in static_pages]
+
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('index'))
+        assert not any('static_pages_staticpage' in query['sql'] for query in context.captured_queries)
+
+        StaticPage.objects.create(title='New page', body='New page')
+        response = client.get(reverse('index'))
+        assert response.context['static_pages'][-1] == {'slug': 'new-page', 'title': 'New page'}
+
+
+@pytest.mark.django_db
+class TestExport:
+    @pytest.fixture
+    def export_root(self, settings, tmp_path):
+        settings.STATIC_PAGES_EXPORT_ROOT = tmp_path
+        return tmp_path
+
+    def test_publish_on_save(self, export_root, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            page = StaticPage.objects.create(title='About us', body='<p>About</p>')
+        html = (export_root / 'p' / 'about-us' / 'index.html').read_text()
+        assert '<p>About</p>' in html
+        assert gzip.decompress((export_root / 'p' / 'about-us' / 'index.html.gz').read_bytes()).decode() == html
+        assert (export_root / 'index.html').exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            page.title = 'Contact'
+            page.save()
+        assert not (export_root / 'p' / 'about-us').exists()
+        assert (export_root / 'p' / 'contact' / 'index.html').exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            page.delete()
+        assert not (export_root / 'p' / 'contact').exists()
+
+    def test_republish_changed_only(self, export_root, static_pages, django_capture_on_commit_callbacks):
+        call_command('publish_static_pages')
+        page, other = static_pages[:2]
+        other_path = export_root / 'p' / other.slug / 'index.html'
+        other_path.write_text('unchanged')
+
+        # A body edit only changes its own page, the menu stays the same.
+        with django_capture_on_commit_callbacks(execute=True):
+            page.body = '<p>Edited</p>'
+            page.save()
+        assert '<p>Edited</p>' in (export_root / 'p' / page.slug / 'index.html').read_text()
+        assert other_path.read_text() == 'unchanged'
+
+        # A new category is in the menu of every page, without the live count of its fundraisers.
+        with django_capture_on_commit_callbacks(execute=True):
+            category = Category.objects.create(name='New category')
+        html = other_path.read_text()
+        assert 'New category' in html
+        assert 'badge' not in html
+
+        other_path.write_text('unchanged')
+        with django_capture_on_commit_callbacks(execute=True):
+            category.save()
+        assert other_path.read_text() == 'unchanged'
+
+    def test_serve_exported(self, export_root, static_pages):
+        call_command('publish_static_pages')
+        client = Client()
+        url = reverse('static_page', args=(static_pages[0].slug,))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+            gzipped = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            index = client.get(reverse('index'))
+        assert len(context.captured_queries) == 0
+        assert response.status_code == 200
+        assert response.content == (export_root / 'p' / static_pages[0].slug / 'index.html').read_bytes()
+        assert gzipped['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(gzipped.content) == response.content
+        assert index.status_code == 200
+
+    def test_serve_dynamic_for_logged_in(self, export_root, static_pages, django_user_model):
+        call_command('publish_static_pages')
+        client = Client()
+        client.force_login(django_user_model.objects.create_user(username='test', password='123456'))
+        response = client.get(reverse('static_page', args=(static_pages[0].slug,)))
+        assert response.context['object'] == static_pages[0]
+
+    def test_serve_dynamic_without_export(self, static_pages):
+        response = Client().get(reverse('static_page', args=(static_pages[0].slug,)))
+        assert response.context['object'] == static_pages[0]
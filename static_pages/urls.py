@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import path
 
 import static_pages.views
 
+ShowPage = static_pages.views.AsyncShowPage if settings.ASYNC_VIEWS else static_pages.views.ShowPage
+
 urlpatterns = [
-    path('<slug:slug>/', static_pages.views.ShowPage.as_view(), name='static_page'),
+    path('<slug:slug>/', ShowPage.as_view(), name='static_page'),
 ]
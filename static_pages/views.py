@@ -1,16 +1,47 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
 from django.views.generic import TemplateView, DetailView
 from django.shortcuts import get_object_or_404
 
+from pomozemy.asynchronous import AsyncViewMixin, database_sync_to_async
 from static_pages.models import StaticPage
+from static_pages.publish import exported_content
 
 
-class ShowPage(DetailView):
+class ExportedPageMixin:
+    def get(self, request, *args, **kwargs):
+        return self.exported_response(request) or super().get(request, *args, **kwargs)
+
+    @staticmethod
+    def exported_response(request):
+        # Pre-rendered pages are the anonymous version; checking the cookie first spares the session lookup.
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES or request.user.is_anonymous:
+            content, encoding = exported_content(request.path, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if content is not None:
+                response = HttpResponse(content)
+                if encoding:
+                    response['Content-Encoding'] = encoding
+                patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+                return response
+
+
+class ShowPage(ExportedPageMixin, DetailView):
     model = StaticPage
     template_name = 'static_page/static_page.html'
 
     def get_object(self, queryset=None):
-        return get_object_or_404(StaticPage, slug=self.kwargs.get('slug'))
+        return get_object_or_404(StaticPage.objects.defer('body', 'body_text'), slug=self.kwargs.get('slug'))
+
+
+class AsyncShowPage(AsyncViewMixin, ShowPage):
+    async def get(self, request, *args, **kwargs):
+        response = await database_sync_to_async(self.exported_response)(request)
+        if response is None:
+            self.object = await database_sync_to_async(self.get_object)()
+            response = self.render_to_response(self.get_context_data(object=self.object))
+        return response
 
 
-class Index(TemplateView):
+class Index(ExportedPageMixin, TemplateView):
     template_name = 'static_page/index.html'